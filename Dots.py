@@ -28,7 +28,9 @@
     * Split the text into unlimited lines and lines into unlimited cells
     * Format cell widths using tab stops
     * Scroll through all of the contents with ease and in many different ways
-    * Load extended dot patterns and draw them on the screen (coming soon)
+    * Load extended dot patterns and draw them on the screen
+    * Drive several displays at once, on the same pins but the enable pin
+    * Change the text without waiting for it to be written on the screen
 
 
   Author and Maintainer
@@ -48,6 +50,22 @@ LCD_LINES = 2
 # Defines the number of characters per line
 CHARS_PER_LINE = 16
 
+# Defines how many parsed lines a lazy buffer keeps at most (see display())
+MAX_RESIDENT_LINES = 256
+
+# Defines the most frames per second written on the LCD screen while scrolling
+# every number of seconds. Scrollers that tick within the same frame share it
+MAX_FPS = 25
+
+# Defines how many translated strings are kept at most (see set_rom())
+MAX_TRANSLATIONS = 256
+
+# Character ROM A00 (Japanese), the one most controllers come with
+ROM_A00 = 'A00'
+
+# Character ROM A02 (European)
+ROM_A02 = 'A02'
+
 # Flag to make cursor visible via the `cursor` function
 CURSOR_VISIBLE = 0x01
 
@@ -58,25 +76,125 @@ CURSOR_BLINK = 0x02
 # _Buffer is a helper class to control the module's
 # internal text buffer. It parses the given text to lines
 # ad holds an internal pointer to the current line
-class _Buffer:
+class _Buffer(object):
+
+  # Buffers, lines and cells keep their fields in slots instead of a
+  # dictionary, because a long text is made of hundreds of thousands of them
+  __slots__ = ('_lines', '_formatter', '_current_line_index', '_screen')
 
   # Parses the raw string internally and constructs the lines array
   # If 'string' is None, then it clears the buffer's contents
-  def parse(self, string):
-    self._lines = []
-    self._raw = string
+  # If 'lazy' is True, the string is only scanned for the boundaries of its
+  # lines, and each _Line is parsed when it is first accessed (see _LazyLines)
+  def parse(self, string, lazy=False):
+    return self.swap(self.prepare(string, lazy))
 
-    if self._raw:
-      for line in self._raw.split('\n'):
-        self._lines += [ _Line(self).parse(line) ]
-      
+
+  # Reads the lines of the file at 'path', mapping it in memory (see
+  # _FileLines) instead of reading it in a string
+  def parse_file(self, path):
+    return self.swap(self.prepare_file(path))
+
+
+  # Parses 'string' into a back buffer: the lines are returned to be put in
+  # the buffer with swap(), and the contents of the buffer are left as they
+  # are until then. 'lazy' is the same as in parse()
+  def prepare(self, string, lazy=False):
+    if lazy:
+      lines = _LazyLines(self)
+      if string: lines.insert(0, string)
+      return lines
+
+    return [ _Line(self).parse(line) for line in string.split('\n') ] \
+                                                            if string else []
+
+
+  # Reads the lines of the file at 'path' into a back buffer (see prepare())
+  def prepare_file(self, path):
+    return _FileLines(self, path)
+
+
+  # Replaces the contents of the buffer with 'lines' prepared with prepare()
+  # or prepare_file(), all at once. The buffer scrolls to the top and forgets
+  # its tab stops. A file the lines were read from before is closed
+  def swap(self, lines):
+    if lines is not self._lines:
+      self.close()
+    self._lines = lines
+    self._formatter = None
     self._reset()
     return self
 
 
+  # Closes the file read with parse_file(), if the lines were read from one
+  def close(self):
+    if isinstance(self._lines, _FileLines):
+      self._lines.close()
+
+
+  # Adds the lines appended to the file read with parse_file() since it was
+  # read or refreshed. Returns the number of lines added
+  def refresh(self):
+    if isinstance(self._lines, _FileLines):
+      return self._lines.refresh()
+    return 0
+
+
   # Appends more lines at the end of the buffer
+  # Only the new lines are parsed, and the buffer stays scrolled where it was
   def append(self, string):
-    return self.parse(self._raw + '\n' + string)
+    return self.insert(self.line_count(), string)
+
+
+  # Inserts more lines in the buffer, before the _Line at 'index'
+  # Only the new lines are parsed. If they are inserted before the current
+  # _Line, the buffer scrolls along so that the same _Line stays current
+  def insert(self, index, string):
+    count = self.line_count()
+
+    if isinstance(self._lines, _LazyLines):
+      self._lines.insert(index, string)
+    else:
+      self._lines[index:index] = self._parse_lines(string, index)
+
+    if count and 0 <= index <= self._current_line_index:
+      self._current_line_index += self.line_count() - count
+    return self
+
+
+  # Removes 'count' many _Lines from the buffer, starting at 'index'
+  # The buffer scrolls along, so that the current _Line stays current. If the
+  # current _Line is removed, the _Line after the removed ones becomes current
+  def remove(self, index, count=1):
+    index = max(index, 0)
+    removed = max(min(count, self.line_count() - index), 0)
+    del self._lines[index : index + count]
+
+    if not self._lines:
+      self._reset()
+    elif index + removed <= self._current_line_index:
+      self._current_line_index -= removed
+    elif index <= self._current_line_index:
+      self._current_line_index = min(index, self.line_count() - 1)
+    return self
+
+
+  # Replaces the text of the _Line at 'index' with 'string' (see
+  # _Line.set_text()), keeping its tab stops and how it is scrolled
+  # A _Line of a lazy buffer that is not parsed yet is parsed from 'string'
+  # the next time it is accessed
+  def update(self, index, string):
+    if '\n' in string:
+      raise ValueError("Text of a single line cannot contain line breaks")
+
+    if isinstance(self._lines, _LazyLines):
+      line = self._lines.update(index, string)
+    else:
+      line = self._lines[index]
+
+    if line is not None:
+      line.set_text(string)
+    return self
 
   
   # Clears the buffer contents
@@ -104,12 +222,11 @@ class _Buffer:
 
   # Returns True if the given _Line is currently displayed on the LCD
   # Returns False otherwise
+  # Only the lines on the screen are looked at, however many lines there are
   def is_displayed(self, line):
-    index = self._lines.index(line)
-    if index is not None and index in range(self._current_line_index,\
-                                self._current_line_index + LCD_LINES):
-      return True
-    else: return False
+    start = self._current_line_index
+    end = min(start + self._screen_size()[0], self.line_count())
+    return any(self._lines[index] is line for index in range(start, end))
 
 
   # Returns True if contents can scroll to 'position', False otherwise
@@ -162,21 +279,58 @@ class _Buffer:
     if self._lines:
       formatted = ""
 
-      for i in range(LCD_LINES):
+      for i in range(self._screen_size()[0]):
         formatted += str(self[ self._current_line_index + i ]) + '\n'
 
       return formatted
 
 
+  # Calls 'formatter' with the index and the _Line, for every _Line in the
+  # buffer and for every _Line added to it later on, until it is parsed again
+  # Lines of a lazy buffer are formatted when they are parsed
+  def format_lines(self, formatter):
+    self._formatter = formatter
+
+    if isinstance(self._lines, _LazyLines):
+      for index, line in self._lines.resident():
+        formatter(index, line)
+    else:
+      for index, line in enumerate(self._lines):
+        formatter(index, line)
+
+
+  # Parses each line of 'string' into a new _Line and returns them
+  # 'index' is the index in the buffer the first of them is going to have
+  def _parse_lines(self, string, index):
+    lines = [ _Line(self).parse(line) for line in string.split('\n') ]
+
+    if self._formatter:
+      for offset, line in enumerate(lines):
+        self._formatter(index + offset, line)
+    return lines
+
+
   # Resets the internal line index
   def _reset(self):
     self._current_line_index = 0
 
 
+  # Returns the number of lines and the number of characters per line of the
+  # screen the buffer is shown on
+  def _screen_size(self):
+    if self._screen is None:
+      return LCD_LINES, CHARS_PER_LINE
+    return self._screen.lines, self._screen.columns
+
+
   # Initializes the _Buffer
-  def __init__(self):
+  # 'screen' is the Display the buffer is shown on. A _Buffer of no Display
+  # has the size of LCD_LINES and CHARS_PER_LINE
+  def __init__(self, screen=None):
     self._lines = []
+    self._formatter = None
     self._current_line_index = 0
+    self._screen = screen
 
   
   # Uses _format_contents to return a formatted string of its contents
@@ -204,22 +358,310 @@ class _Buffer:
 ################################################################################
 
 
+from array import array
+from collections import OrderedDict
+
+
+# _LazyLines holds the lines of a lazy _Buffer. It keeps the text of the lines
+# and where each of them starts and ends in it, found with a single scan, but
+# parses a _Line only when it is accessed. At most MAX_RESIDENT_LINES parsed
+# _Lines are kept, and the least recently accessed ones are dropped. A dropped
+# _Line is parsed again the next time it is accessed, so it forgets how it was
+# scrolled and any tab stops set to it alone (tab stops set through format()
+# are set again)
+# The text is kept in chunks, as it was given. A chunk is dropped once none of
+# the lines is in it any more, so that replacing the same lines over and over
+# keeps no more text than the lines have
+class _LazyLines(object):
+
+  # Chunks that are kept even when no line is in them
+  _PINNED_CHUNKS = 0
+
+
+  # Inserts the lines of 'text' before the line at 'index', without parsing
+  # any of them
+  def insert(self, index, text):
+    starts, ends = self._scan(text)
+    self._insert_scanned(index, self._add_chunk(text), starts, ends)
+
+
+  # Replaces the text of the line at 'index'. The _Line is not parsed again
+  # here; the parsed _Line is returned to be updated, or None if the line is
+  # not parsed
+  def update(self, index, text):
+    if index < 0: index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("Line index out of range: {}".format(index))
+
+    self._release_chunk(self._chunk_indices[index], 1)
+    chunk = self._add_chunk(text)
+    self._references[chunk] += 1
+    self._chunk_indices[index] = chunk
+    self._starts[index] = 0
+    self._ends[index] = len(text)
+    return self._resident.get(index)
+
+
+  # Returns the (index, _Line) pairs of the _Lines currently parsed
+  def resident(self):
+    return list(self._resident.items())
+
+
+  # Returns the line of text at 'index', as it was given
+  def text(self, index):
+    chunk = self._chunks[ self._chunk_indices[index] ]
+    return chunk[ self._starts[index] : self._ends[index] ]
+
+
+  # Returns the [start, end) positions of every line within 'text', starting
+  # from the line at 'start'. Lines are split at every 'newline'
+  def _scan(self, text, start=0, newline='\n'):
+    starts, ends = array('L'), array('L')
+
+    while True:
+      end = text.find(newline, start)
+      if end < 0: break
+      starts.append(start)
+      ends.append(end)
+      start = end + 1
+
+    starts.append(start)
+    ends.append(len(text))
+    return starts, ends
+
+
+  # Inserts the lines of the chunk at 'chunk', which start and end at 'starts'
+  # and 'ends' within it, before the line at 'index'
+  def _insert_scanned(self, index, chunk, starts, ends):
+    self._chunk_indices[index:index] = array('L', [chunk]) * len(starts)
+    self._references[chunk] += len(starts)
+    self._starts[index:index] = starts
+    self._ends[index:index] = ends
+    self._shift_resident(index, len(starts))
+
+
+  # Keeps 'text' in a chunk, in the place of a dropped one if there is any, and
+  # returns the index of the chunk. No line is in it yet
+  def _add_chunk(self, text):
+    if self._free_chunks:
+      chunk = self._free_chunks.pop()
+      self._chunks[chunk] = text
+    else:
+      chunk = len(self._chunks)
+      self._chunks += [ text ]
+      self._references += [ 0 ]
+    return chunk
+
+
+  # Takes 'count' lines out of the chunk at 'chunk', and drops the chunk once
+  # none of the lines is in it
+  def _release_chunk(self, chunk, count):
+    self._references[chunk] -= count
+    if not self._references[chunk] and chunk >= self._PINNED_CHUNKS:
+      self._chunks[chunk] = None
+      self._free_chunks += [ chunk ]
+
+
+  # Moves the parsed _Lines at 'index' and after it by 'offset' places
+  def _shift_resident(self, index, offset):
+    resident = OrderedDict()
+
+    for i, line in self._resident.items():
+      if i >= index: i += offset
+      resident[i] = line
+
+    self._resident = resident
+
+
+  # Parses the line at 'index' and keeps it, dropping the least recently
+  # accessed _Line if there are more than MAX_RESIDENT_LINES
+  def _materialize(self, index):
+    line = _Line(self._buffer).parse(self.text(index))
+    if self._buffer._formatter:
+      self._buffer._formatter(index, line)
+
+    self._resident[index] = line
+    if len(self._resident) > MAX_RESIDENT_LINES:
+      self._resident.popitem(last=False)
+    return line
+
+
+  # Initializes _LazyLines for the given _Buffer
+  def __init__(self, buffer):
+    self._buffer = buffer
+    self._chunks = []
+    self._references = []
+    self._free_chunks = []
+    self._chunk_indices = array('L')
+    self._starts = array('L')
+    self._ends = array('L')
+    self._resident = OrderedDict()
+
+
+  # Returns the number of lines
+  def __len__(self):
+    return len(self._starts)
+
+
+  # Returns the _Line at 'index', parsing it if needed
+  def __getitem__(self, index):
+    if index < 0: index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("Line index out of range: {}".format(index))
+
+    line = self._resident.pop(index, None)
+    if line is None:
+      return self._materialize(index)
+    self._resident[index] = line
+    return line
+
+
+  # Removes the lines within 'lines' (a slice)
+  def __delitem__(self, lines):
+    start, stop, step = lines.indices(len(self))
+    stop = max(start, stop)
+
+    for chunk in self._chunk_indices[start:stop]:
+      self._release_chunk(chunk, 1)
+
+    del self._chunk_indices[start:stop]
+    del self._starts[start:stop]
+    del self._ends[start:stop]
+
+    for i in range(start, stop):
+      self._resident.pop(i, None)
+    self._shift_resident(stop, start - stop)
+
+
+  # Iterates through all of the lines, parsing each of them in turn
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self[index]
+
+
+# Class _LazyLines END
+################################################################################
+
+
+import os
+from mmap import mmap, ACCESS_READ
+
+
+# _FileLines holds the lines of a _Buffer read from a file. The file is mapped
+# in memory instead of being read, and its lines are parsed lazily, exactly as
+# those of _LazyLines. Lines appended to the file are added with refresh(),
+# which maps and scans only the part of the file written since the last time
+class _FileLines(_LazyLines):
+
+  # The file is mapped in the first chunk, even while none of its lines is read
+  _PINNED_CHUNKS = 1
+
+
+  # Maps the part of the file written since the last refresh and adds its lines
+  # A last line without a line break is scanned again, because it may have
+  # been only partly written before. A file that got shorter is read again from
+  # its start
+  # Returns the number of lines added
+  def refresh(self):
+    size = os.fstat(self._file.fileno()).st_size
+    if size == self._size:
+      return 0
+    if size < self._size:
+      del self[:]
+      self._scanned, self._partial = 0, False
+    if not size:
+      self._unmap()
+      self._size = 0
+      return 0
+
+    count = len(self)
+    self._unmap()
+    self._chunks[0] = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+    self._size = size
+
+    # Lines added to the _Buffer otherwise may come after those of the file
+    index = count
+    while index and self._chunk_indices[index - 1] != 0:
+      index -= 1
+
+    if self._partial:
+      index -= 1
+      del self[index : index + 1]
+
+    starts, ends = self._scan(self._chunks[0], self._scanned, b'\n')
+    # Nothing comes after a line break at the end of the file yet
+    self._partial = starts[-1] < size
+    if not self._partial:
+      starts.pop()
+      ends.pop()
+    self._scanned = starts[-1] if self._partial else size
+
+    self._insert_scanned(index, 0, starts, ends)
+    return len(self) - count
+
+
+  # Closes the file and its map. Lines that are not parsed yet cannot be read
+  # any more
+  def close(self):
+    self._unmap()
+    self._file.close()
+
+
+  # Closes the map of the file, if it is mapped
+  def _unmap(self):
+    if isinstance(self._chunks[0], mmap):
+      self._chunks[0].close()
+    self._chunks[0] = b''
+
+
+  # Returns the line of text at 'index', decoded from UTF-8 if it was read
+  # from the file
+  def text(self, index):
+    line = _LazyLines.text(self, index)
+    if self._chunk_indices[index]:
+      return line
+
+    line = line.rstrip(b'\r')
+    return line if isinstance(line, str) else line.decode('utf-8', 'replace')
+
+
+  # Opens the file at 'path' and adds its lines
+  def __init__(self, buffer, path):
+    _LazyLines.__init__(self, buffer)
+    self._file = open(path, 'rb')
+    self._chunks = [ b'' ]
+    self._references = [ 0 ]
+    self._size = 0
+    self._scanned = 0
+    self._partial = False
+    self.refresh()
+
+
+# Class _FileLines END
+################################################################################
+
+
 # Helper class that formats a given line of string for display
 # on the lcd screen
 # The text in the line can be split into multiple cells using tab stops
 # Each cell is displayed and scrolled seperately on the screen
-class _Line:
+class _Line(object):
+
+  __slots__ = ('_parent', '_cells', '_tab_stops', '_current_cell_index',
+               '_last_visible_cell_index', '_formatted', '_laid_out')
 
   # Parses the given string
   def parse(self, string):
     self._cells = []
-    self._raw = string
+    self._tab_stops = []
+    self._invalidate()
 
-    if self._raw:
-      cells = self._raw.split('\t')
+    if string:
+      cells = string.split('\t')
+      width = self._columns()
 
       for cell in cells:
-        self._cells += [ _Cell(self, text=cell) ]
+        self._cells += [ _Cell(self, text=cell, width=width) ]
       
       self._auto_tab_stops()
     
@@ -227,6 +669,26 @@ class _Line:
     return self
 
 
+  # Replaces the text of the line with 'string', keeping its tab stops and
+  # how it is scrolled. If 'string' has as many cells as the line, the text of
+  # each cell is replaced (see _Cell.set_text()). Otherwise the line is parsed
+  # again, and the tab stops are kept if there are enough of them
+  def set_text(self, string):
+    texts = string.split('\t') if string else []
+
+    if len(texts) == self.cell_count():
+      for cell, text in zip(self._cells, texts):
+        cell.set_text(text)
+    else:
+      tab_stops = self._tab_stops
+      index = self._current_cell_index
+      self.parse(string)
+      if self._cells and len(tab_stops) >= self.cell_count() - 1:
+        self.set_tab_stops(tab_stops)
+      self.scroll_to(index)
+    return self
+
+
   # Returns the text contained in cell at index
   # If index is left blank, the internal cell index is used
   # If index exceeds cell_count(), it circles back to the beginning
@@ -258,20 +720,19 @@ class _Line:
     if not all(x < y for x, y in zip(tab_stops, tab_stops[1:])):
       raise ValueError("Tab stops must be in ascending order")
  
-    self._tab_stops = tab_stops
+    self._tab_stops = list(tab_stops)
     self._distribute_cell_widths()
+    self._invalidate()
 
 
   # Returns True if this _Line is currently displayed on the LCD screen
   # Returns False otherwise
+  # Only the cells on the screen are looked at, however many cells there are
   def is_displayed(self, cell=None):
     if cell:
-      index = self._cells.index(cell)
-    
-      if self.is_displayed() and index in range(self._current_cell_index,\
-                   self._current_cell_index + self._last_visible_cell_index):
-        return True
-      else: return False
+      visible = self._cells[ self._current_cell_index :\
+                             self._last_visible_cell_index + 1 ]
+      return any(c is cell for c in visible) and self.is_displayed()
 
     else: return self._parent.is_displayed(self)
 
@@ -288,7 +749,9 @@ class _Line:
   # cell
   def scroll_to(self, position):
     if self.scrolls_to(position):
-      self._current_cell_index = position
+      if position != self._current_cell_index:
+        self._current_cell_index = position
+        self._invalidate()
     else:
       self.scroll_start() if position < 0 else self.scroll_end()
 
@@ -316,56 +779,85 @@ class _Line:
 
 
   # Turns its contents into a formatted string to be written on the LCD screen
+  # The string is kept until the line or any of its cells changes
   def _format_contents(self, tab_stops=None):
+    if self._formatted is not None:
+      return self._formatted
+
     formatted = ""
 
     if self._cells:
-      for cell in self._cells[self._current_cell_index:]:
-        if len(formatted) >= CHARS_PER_LINE: break
-        formatted += str(cell)
-        self._last_visible_cell_index = self._cells.index(cell)
+      columns = self._columns()
+      for index in range(self._current_cell_index, self.cell_count()):
+        if len(formatted) >= columns: break
+        formatted += self._cells[index]._format_contents()
+        self._last_visible_cell_index = index
 
-      return formatted[:CHARS_PER_LINE]
+      self._formatted = formatted[:columns]
+      return self._formatted
+
+
+  # Returns the formatted contents of all of the cells, as they would be
+  # written on an LCD screen wide enough to show them all, along with the
+  # position of the current cell within them
+  def _laid_out_contents(self):
+    if self._laid_out is None:
+      contents = ''.join(cell._format_contents() for cell in self._cells)
+      offset = sum(cell.get_width() for cell in \
+                                      self._cells[:self._current_cell_index])
+      self._laid_out = (contents, offset)
+    return self._laid_out
+
+
+  # Drops the formatted contents kept, so that they are formatted again the
+  # next time they are needed
+  def _invalidate(self):
+    self._formatted = None
+    self._laid_out = None
 
 
   # Resets the internal cell index
   def _reset(self):
     self._current_cell_index = 0
     self._last_visible_cell_index = 0
+    self._invalidate()
+
+
+  # Returns the number of characters per line of the screen the line is
+  # shown on
+  def _columns(self):
+    return self._parent._screen_size()[1]
 
 
   # Generates evenly spaced tab stops based on their count
-  # Up to 16 tab stops can be generated automatically and fitted
-  # within the 16-character line of the lcd screen. If their width
+  # As many tab stops as there are characters per line can be generated
+  # automatically and fitted within the line of the lcd screen. If their width
   # cannot be divided exactly to an integer amount, it will be floored
   # to the nearest integer, so contents of the last cell might be
   # partly or totally hidden, and you should call scroll_left() on the
   # line to make them visible
   def _auto_tab_stops(self):
-    count = min(self.cell_count(), 16)
+    columns = self._columns()
+    count = min(self.cell_count(), columns)
     tab_stops = [] 
     for i in range(count - 1):
-      tab_stops += [(16 / count) * (i + 1)]
+      tab_stops += [(columns // count) * (i + 1)]
 
     self.set_tab_stops(tab_stops)
   
   
   # Distributes the width of each cell in the line
+  # Each cell spans from its tab stop to the next one, and the last cell to
+  # the end of the line of the screen it ends on
   def _distribute_cell_widths(self):
-    for cell in self._cells:
-      index = self._cells.index(cell)
-      cell.set_width( self._calculate_cell_width(index) )
-
-
-  # Calculates the width of a cell based on its bounding tab stops
-  # If index is left blank, _current_cell_index will be used.
-  # Notice that this function does not check if index is out of bounds
-  def _calculate_cell_width(self, index):
+    columns = self._columns()
     last = ([0] + self._tab_stops)[-1]
-    padding_end = 16 - (last % 16)
-    cell_start = ([0] + self._tab_stops)[index]
-    cell_end   = (self._tab_stops + [last + padding_end])[index]
-    return cell_end - cell_start
+    padding_end = columns - (last % columns)
+    starts = [0] + self._tab_stops
+    ends = self._tab_stops + [last + padding_end]
+
+    for cell, cell_start, cell_end in zip(self._cells, starts, ends):
+      cell.set_width( cell_end - cell_start )
      
 
   # Initializes the _Line
@@ -383,11 +875,9 @@ class _Line:
 
 
   # Returns the _Line's cumulative sum of its cell widths
+  # That is the length of its laid out contents, which are kept formatted
   def __len__(self):
-    length = 0
-    for cell in self._cells:
-      length += cell.get_width()
-    return length
+    return len(self._laid_out_contents()[0])
 
 
   # Makes it possible to access a _Cell by applying indexing on the _Line
@@ -407,15 +897,34 @@ class _Line:
 ################################################################################
 
 
-class _Cell:
+class _Cell(object):
+
+  __slots__ = ('_parent', '_text', '_width', '_scroll_offset', '_formatted')
+
+  # The text of the cell
+  # Setting it formats the cell (and its _Line) again the next time it is
+  # written on the screen
+  @property
+  def text(self):
+    return self._text
+
+
+  @text.setter
+  def text(self, text):
+    self._text = text
+    self._invalidate()
+
 
   # Sets the width of the cell
   def set_width(self, width):
-    if width < 1 or width > CHARS_PER_LINE:
+    columns = self._parent._columns()
+    if width < 1 or width > columns:
       raise ValueError("Width of cell should be between 1 and {} characters"\
-                                                      .format(CHARS_PER_LINE))
+                                                      .format(columns))
 
-    self._width = width
+    if width != self._width:
+      self._width = width
+      self._invalidate()
     self.scroll_to(0)
 
 
@@ -424,6 +933,18 @@ class _Cell:
     return self._width
 
 
+  # Replaces the text of the cell, keeping its width and how it is scrolled
+  # If the new text is shorter, it is scrolled back only as much as needed to
+  # fill the cell
+  def set_text(self, text):
+    if '\t' in text or '\n' in text:
+      raise ValueError("Text of a cell cannot contain tabs or line breaks")
+
+    self._scroll_offset = max(min(self._scroll_offset,
+                                  len(text) - self._width), 0)
+    self.text = text
+
+
   # Returns true if the _Cell is currently displayed on the LCD screen
   # Returns False otherwise
   def is_displayed(self):
@@ -434,7 +955,7 @@ class _Cell:
   # Contents can scroll until there are no more hidden characters past the
   # right boundary of the cell
   def scrolls_to(self, position):
-    return position in range(len(self.text) - self.get_width() + 1)
+    return position in range(len(self._text) - self.get_width() + 1)
 
 
   # Scrolls the text to the character at 'position' within the displayed string
@@ -444,8 +965,10 @@ class _Cell:
   # end
   def scroll_to(self, position):
     if self.scrolls_to(position):
-      self._scroll_offset = position
-    elif len(self.text) > self.get_width():
+      if position != self._scroll_offset:
+        self._scroll_offset = position
+        self._invalidate()
+    elif len(self._text) > self.get_width():
       self.scroll_start() if position < 0 else self.scroll_end()
 
 
@@ -468,27 +991,41 @@ class _Cell:
 
   # Scrolls to the end of the text
   def scroll_end(self):
-    self.scroll_to(len(self.text) - self.get_width())
+    self.scroll_to(len(self._text) - self.get_width())
 
 
   # Returns the portion of text that fits inside the cell. If the
   # text length is larger than the cell's width, it can be scrolled
   # using scroll_right(), scroll_left() or scroll_to() methods
+  # The portion is kept until the text, the width or the scrolling changes
   def _format_contents(self):
-    start = self._scroll_offset
-    end = start + self.get_width()
-    return self.text[ start : end ].ljust(self.get_width())
+    if self._formatted is None:
+      start = self._scroll_offset
+      end = start + self.get_width()
+      self._formatted = self._text[ start : end ].ljust(self.get_width())
+    return self._formatted
+
+
+  # Drops the formatted portion of text kept, along with the formatted
+  # contents of the _Line. A cell that is not kept formatted is not part of
+  # any contents the _Line keeps either, so nothing is dropped for it
+  def _invalidate(self):
+    if self._formatted is not None:
+      self._formatted = None
+      self._parent._invalidate()
 
 
   # Initializes the cell with some text and specifies its width
-  # (16 characters by default)
-  def __init__(self, parent, text, width=16):
+  # (as wide as the line of the screen by default)
+  def __init__(self, parent, text, width=None):
     if not isinstance(parent, _Line):
       raise TypeError("Parent must be an instance of _Line")
     self._parent = parent
-    self.text = text
-    self.set_width(width)
+    self._text = text
+    self._formatted = None
+    self._width = None
     self._scroll_offset = 0
+    self.set_width(width or parent._columns())
 
 
   def __str__(self):
@@ -500,7 +1037,141 @@ class _Cell:
 
 
 from abc import ABCMeta, abstractmethod
-from threading import Timer
+from threading import Thread, Condition
+from heapq import heappush, heappop
+from itertools import count
+from traceback import print_exc
+
+try:
+  from time import monotonic
+except ImportError:
+  from time import time as monotonic
+
+
+# _Scheduler runs jobs at given times of a monotonic clock from a single
+# background thread, so that any number of scrollers can run at the same time
+# without creating a new thread on every tick. Jobs are kept in a heap keyed by
+# the time they are due
+class _Scheduler(object):
+
+  # Schedules 'job' to be called at 'due' seconds of clock(). The job is given
+  # the time it was due, so it can schedule itself again without drifting
+  # Returns an entry that can be given to cancel()
+  def schedule(self, due, job):
+    self._condition.acquire()
+
+    entry = [due, next(self._sequence), job]
+    heappush(self._heap, entry)
+    if not self._thread:
+      self._thread = Thread(target=self._run)
+      self._thread.daemon = True
+      self._thread.start()
+    self._condition.notify()
+
+    self._condition.release()
+    return entry
+
+
+  # Schedules 'job' to be called once, as soon as 'interval' seconds have passed
+  # since the last time it was called through throttle(). Requests made while
+  # the call is still pending are merged into it, so however often it is
+  # requested, 'job' is called at most once every 'interval' seconds
+  def throttle(self, job, interval):
+    self._condition.acquire()
+
+    if job not in self._throttled:
+      due = self.clock()
+      if job in self._last_calls:
+        due = max(due, self._last_calls[job] + interval)
+      self._throttled[job] = self.schedule(due,
+                                        lambda due: self._call_throttled(job))
+
+    self._condition.release()
+
+
+  # Cancels a scheduled job, if it has not run yet
+  def cancel(self, entry):
+    self._condition.acquire()
+    entry[2] = None
+    self._condition.release()
+
+
+  # Returns the current time of the scheduler's clock in seconds
+  def clock(self):
+    return monotonic()
+
+
+  # Calls a job that was requested through throttle()
+  # Requests made from now on are scheduled for the next call
+  def _call_throttled(self, job):
+    self._condition.acquire()
+    del self._throttled[job]
+    self._last_calls[job] = self.clock()
+    self._condition.release()
+
+    job()
+
+
+  # Waits for the next jobs to be due and runs them, forever
+  def _run(self):
+    while True:
+      self._condition.acquire()
+
+      while True:
+        # Drop cancelled jobs
+        while self._heap and self._heap[0][2] is None:
+          heappop(self._heap)
+
+        if not self._heap:
+          self._condition.wait()
+        elif self._heap[0][0] > self.clock():
+          self._condition.wait(self._heap[0][0] - self.clock())
+        else:
+          break
+
+      # Take every job that is due by now, not only the first one
+      now, jobs = self.clock(), []
+      while self._heap and self._heap[0][0] <= now:
+        due, sequence, job = heappop(self._heap)
+        if job: jobs += [ (due, job) ]
+
+      self._condition.release()
+
+      # A failing job must not stop the jobs of every other scroller
+      try:
+        if self._together:
+          with self._together():
+            self._run_jobs(jobs)
+        else:
+          self._run_jobs(jobs)
+      except Exception:
+        print_exc()
+
+
+  # Calls each one of the (due, job) pairs of 'jobs', in order
+  def _run_jobs(self, jobs):
+    for due, job in jobs:
+      try:
+        job(due)
+      except Exception:
+        print_exc()
+
+
+  # Initializes the _Scheduler. Its thread starts with the first job
+  # Jobs that are due at the same time are run within 'together' (a context
+  # manager, such as _Bus.interleaved), if given
+  def __init__(self, together=None):
+    self._together = together
+    self._heap = []
+    self._sequence = count()
+    self._condition = Condition()
+    self._thread = None
+    self._throttled = {}
+    self._last_calls = {}
+
+
+# Class _Scheduler END
+################################################################################
 
 
 # _Scroller is a base class that serves as a common ancestor of the concrete
@@ -512,44 +1183,94 @@ class _Scroller:
   __metaclass__ = ABCMeta
 
 
-  # Performs the scrolling once
+  # Performs the scrolling once and writes the result on the screen right away
   def once(self):
-    self._perform_scroll()
+    self._locked_scroll()
+    if self._is_displayed(): self._rewrite()
 
 
   # Performs the scrolling repeatedly every 'seconds'
-  # This method starts a new Timer that calls the same function after the given
-  # time delay in seconds, until the contents of the container can no longer
-  # scroll. If circular is set to True, the scrolling is going to repeat back
-  # and forth forever until stop() is called
+  # The first scroll is performed right away and the next ones are scheduled
+  # every 'seconds' after it, until the contents of the container can no longer
+  # scroll. Then 'callback' is called (if given) after one more interval
   def every(self, seconds, callback=None):
-    if not self._stopped:
-      if self._perform_scroll():
-        Timer(seconds, self.every, [seconds, callback]).start()
-      elif callback: Timer(seconds, callback).start()
-    else: self._stopped = False
-
+    self._start(seconds, callback, bounce=False)
     return self
 
+
   # Scrolls indefinitely left and right every 'seconds'
   def bounce(self, seconds):
-
-    def _bounce():
-      if not self._stopped:
-        self.every(seconds, _reverse)
-
-    def _reverse():
-      if not self._stopped:
-        self._scroll_offset = -self._scroll_offset
-        _bounce()
-
-    _bounce()
+    self._start(seconds, None, bounce=True)
     return self
 
 
   # Stops the scrolling of the contents
+  # Scrolling can start again right away with every() or bounce()
   def stop(self):
     self._stopped = True
+    self._run += 1
+    if self._pending:
+      self._scheduler.cancel(self._pending)
+      self._pending = None
+
+
+  # Stops any scrolling in progress and starts scrolling every 'seconds'
+  def _start(self, seconds, callback, bounce):
+    self.stop()
+    self._stopped = False
+    self._seconds = seconds
+    self._callback = callback
+    self._bounce = bounce
+    self._tick(self._scheduler.clock(), self._run)
+
+
+  # Performs one scroll that was due at 'due' and schedules the next one
+  # 'run' tells which call to every() or bounce() scheduled the scroll, so that
+  # ticks left over from a stopped run are ignored
+  def _tick(self, due, run):
+    if run != self._run: return
+
+    due += self._seconds
+    tick = lambda due: self._tick(due, run)
+    will_scroll_further = self._locked_scroll()
+
+    # Scrollers that tick together share the same frame, and frames are written
+    # at most MAX_FPS times per second
+    if self._is_displayed():
+      self._scheduler.throttle(self._background_rewrite, 1.0 / MAX_FPS)
+
+    if will_scroll_further:
+      self._pending = self._scheduler.schedule(due, tick)
+    elif self._bounce:
+      self._scroll_offset = -self._scroll_offset
+      self._pending = self._scheduler.schedule(due, tick)
+    elif self._callback:
+      self._pending = self._scheduler.schedule(due, lambda due: \
+                                        run == self._run and self._callback())
+
+
+  # Performs the scroll under the lock of the display, so that no frame is
+  # planned while the contents are halfway scrolled
+  def _locked_scroll(self):
+    self._lock.acquire()
+
+    try:
+      return self._perform_scroll()
+    finally:
+      self._lock.release()
+
+
+  # Initializes the parts of the _Scroller common to all containers
+  # 'rewrite' and 'background_rewrite' request frames of the display the
+  # container is shown on (see Display._rewrite()) and 'lock' is its lock
+  def __init__(self, rewrite, background_rewrite, scheduler, lock):
+    self._rewrite = rewrite
+    self._background_rewrite = background_rewrite
+    self._scheduler = scheduler
+    self._lock = lock
+    self._pending = None
+    self._stopped = False
+    self._run = 0
 
 
   # Registers a scroll of the contents of a container by offset many places
@@ -563,11 +1284,20 @@ class _Scroller:
   # Performs the actual scroll by the value previously specified with _scroll()
   # Child classes implement this method to provide custom scroll functionality
   # for all the different types of containers (_Buffer, _Line and _Cell)
+  # Returns True if contents can further scroll to that direction,
+  # False otherwise
   @abstractmethod
   def _perform_scroll(self):
     pass
 
 
+  # Returns True if the scrolled container is currently on the screen, so that
+  # scrolling it changes what the screen shows
+  @abstractmethod
+  def _is_displayed(self):
+    pass
+
+
 # Class _Scroller END
 ################################################################################
 
@@ -620,16 +1350,19 @@ class _ScreenScroller(_Scroller):
     else:
       will_scroll_further = self._scroll_down(self._scroll_offset)
 
-    self._rewrite()
     return will_scroll_further
 
 
+  # The contents of the buffer are always on the screen
+  def _is_displayed(self):
+    return True
+
+
   # Initializes the _Scroller
-  def __init__(self, buffer, rewrite):
+  def __init__(self, buffer, rewrite, background_rewrite, scheduler, lock):
+    _Scroller.__init__(self, rewrite, background_rewrite, scheduler, lock)
     self.__buffer = buffer
-    self._rewrite = rewrite
     self._scroll_offset = buffer._current_line_index
-    self._stopped = False
 
 
 # Class _ScreenScroller END
@@ -684,17 +1417,19 @@ class _LineScroller(_Scroller):
     else:
       will_scroll_further = self._scroll_left(self._scroll_offset)
 
-    if self._line.is_displayed(): self._rewrite()
-
     return will_scroll_further
 
 
+  # Returns True if the _Line is currently on the screen
+  def _is_displayed(self):
+    return self._line.is_displayed()
+
+
   # Initializes the _Scroller
-  def __init__(self, line, rewrite):
+  def __init__(self, line, rewrite, background_rewrite, scheduler, lock):
+    _Scroller.__init__(self, rewrite, background_rewrite, scheduler, lock)
     self._line = line
-    self._rewrite = rewrite
     self._scroll_offset = line._current_cell_index
-    self._stopped = False
 
 
 # Class _LineScroller END
@@ -749,146 +1484,1557 @@ class _CellScroller(_Scroller):
     else:
       will_scroll_further = self._scroll_left(self._scroll_offset)
 
-    if self._cell.is_displayed(): self._rewrite()
-
     return will_scroll_further
 
 
+  # Returns True if the _Cell is currently on the screen
+  def _is_displayed(self):
+    return self._cell.is_displayed()
+
+
   # Initializes the _Scroller
-  def __init__(self, cell, rewrite):
+  def __init__(self, cell, rewrite, background_rewrite, scheduler, lock):
+    _Scroller.__init__(self, rewrite, background_rewrite, scheduler, lock)
     self._cell = cell
-    self._rewrite = rewrite
     self._scroll_offset = cell._scroll_offset
-    self._stopped = False
 
 
 # Class _CellScroller END
 ################################################################################
 
 
+try:
+  _chr = unichr
+except NameError:
+  _chr = chr
+
+
+# _Glyphs keeps the custom 5x8 dot patterns (glyphs) that can be shown in the
+# text. Each glyph is registered under a name and stands in the text as a
+# character of the Unicode private use area. The controller holds at most
+# __SLOTS glyphs at a time, in the slots of its CGRAM, so glyphs are loaded as
+# they come on the screen. A glyph takes the slot of the least recently shown
+# glyph that is not on the screen any more, and it is loaded again only when
+# it has lost its slot or its pattern has changed
+class _Glyphs(object):
+
+  # Number of slots in CGRAM, with the 5x8 font
+  __SLOTS = 8
+
+  # First and last character of the private use area glyphs stand as
+  __FIRST_CHAR = 0xe000
+  __LAST_CHAR = 0xf8ff
+
+  # Registers 'pattern' under 'name', or changes the pattern of the glyph
+  # already registered under it. 'pattern' holds the 8 rows of dots of the
+  # glyph, from top to bottom, each row an integer whose 5 least significant
+  # bits are its dots from left to right
+  # Returns the character that stands for the glyph in the text
+  def register(self, name, pattern):
+    pattern = tuple(pattern)
+    if len(pattern) != 8 or not all(0 <= row <= 0x1f for row in pattern):
+      raise ValueError("Pattern should be 8 rows of 5 dots (0x00 to 0x1f)")
+
+    char = self._chars.get(name)
+    if char is None:
+      char = self._new_char()
+      self._chars[name] = char
+
+    if char in self._slots and self._patterns[char] != pattern:
+      self._stale.add(char)
+    self._patterns[char] = pattern
+    return char
+
+
+  # Returns the character that stands for the glyph with 'pattern', which is
+  # registered under the pattern itself. Widgets draw with such tiles, so
+  # that tiles of the same pattern are loaded only once, whoever draws them
+  def tile(self, pattern):
+    pattern = tuple(pattern)
+    return self._chars.get(pattern) or self.register(pattern, pattern)
+
+
+  # Returns the character that stands for the glyph registered under 'name',
+  # or None if there is no such glyph
+  def find(self, name):
+    return self._chars.get(name)
+
+
+  # Returns the character that stands for the glyph registered under 'name'
+  def char(self, name):
+    if name not in self._chars:
+      raise ValueError("No glyph registered under '{}'".format(name))
+    return self._chars[name]
+
+
+  # Returns True if the glyph 'char' stands for is loaded in a slot
+  def is_loaded(self, char):
+    return char in self._slots
+
+
+  # Loads the glyphs found in 'rows' in slots, as many as there are
+  # Returns the (HD44780 function, argument) pairs that load them, the rows
+  # with any glyph that found no slot replaced by a blank, and the code of the
+  # slot of each glyph in the rows
+  def place(self, rows):
+    if not self._patterns:
+      return [], rows, {}
+    shown = sorted(set(''.join(rows)).intersection(self._patterns))
+    if not shown:
+      return [], rows, {}
+
+    # Glyphs on the screen become the most recently shown ones
+    for char in shown:
+      if char in self._slots:
+        self._slots[char] = self._slots.pop(char)
+
+    for char in shown:
+      if char not in self._slots:
+        slot = self._free_slot(shown)
+        if slot is None: break
+        self._slots[char] = slot
+        self._stale.add(char)
+
+    plan = []
+    for char in shown:
+      if char in self._stale:
+        plan += [ (HD44780.set_cgram_address, self._slots[char] * 8),
+                  (HD44780.write, list(self._patterns[char])) ]
+        self._stale.discard(char)
+
+    unplaced = set(shown).difference(self._slots)
+    if unplaced:
+      rows = [ ''.join(' ' if char in unplaced else char for char in row) \
+                                                              for row in rows ]
+    return plan, rows, dict((char, self._slots[char]) for char in shown \
+                                                    if char in self._slots)
+
+
+  # Forgets what is loaded in the slots, so that glyphs are loaded again
+  # Called when the controller is initialized, since CGRAM holds garbage then
+  def unload(self):
+    self._slots = OrderedDict()
+    self._stale = set()
+
+
+  # Returns a character no glyph stands as yet. Once the private use area runs
+  # out, the character of the oldest tile that is not loaded is taken over,
+  # since tiles are registered anew whenever they are drawn (see tile())
+  def _new_char(self):
+    if self.__FIRST_CHAR + self._count <= self.__LAST_CHAR:
+      self._count += 1
+      return _chr(self.__FIRST_CHAR + self._count - 1)
+
+    for name, char in self._chars.items():
+      if isinstance(name, tuple) and char not in self._slots:
+        del self._chars[name]
+        del self._patterns[char]
+        self._stale.discard(char)
+        return char
+    raise ValueError("No more glyphs can be registered")
+
+
+  # Returns a slot no glyph is loaded in, or else frees the slot of the least
+  # recently shown glyph that is not among those 'shown'
+  # Returns None if every slot holds a glyph that is shown
+  def _free_slot(self, shown):
+    if len(self._slots) < self.__SLOTS:
+      return min(set(range(self.__SLOTS)).difference(self._slots.values()))
+
+    for char, slot in self._slots.items():
+      if char not in shown:
+        del self._slots[char]
+        return slot
+    return None
+
+
+  # Initializes _Glyphs with no glyphs registered
+  def __init__(self):
+    self._chars = OrderedDict()
+    self._patterns = {}
+    self._count = 0
+    self.unload()
+
+
+# Class _Glyphs END
+################################################################################
+
+
+# _Canvas treats a region of the screen, 'columns' characters wide and 'lines'
+# lines tall, as a grid of dots (pixels) that can be drawn on one by one. The
+# pixels are kept in a NumPy array, which is sliced into the 5x8 tiles of the
+# characters when the canvas is drawn on the screen. Identical tiles are drawn
+# with the same glyph, so a canvas shows as long as it is made of no more
+# than 8 distinct tiles besides the blank one (tiles that do not fit are left
+# blank)
+# NumPy is imported when a _Canvas is created, so it is only needed by those
+# who draw on one
+class _Canvas(object):
+
+  # Turns the pixel at column 'x' and row 'y' on, or off if 'on' is False
+  # Pixels are counted from the top left corner of the canvas
+  def set(self, x, y, on=True):
+    self.pixels[y, x] = on
+
+
+  # Turns all of the pixels off
+  def clear(self):
+    self.pixels[:] = False
+
+
+  # Returns the text that draws the canvas, one line of text per line of the
+  # canvas. It can be displayed, or put in lines and cells, as any other text
+  def text(self):
+    numpy, lines, columns = self._numpy, self.lines, self.columns
+
+    # Tile at line l and column c: the rows of dots [l, :, c], each row
+    # packed into an integer with its dots from left to right
+    rows = self.pixels.reshape(lines, 8, columns, 5).dot(self._weights)
+    patterns = rows.transpose(0, 2, 1).reshape(lines * columns, 8)
+    unique, tiles = numpy.unique(patterns, axis=0, return_inverse=True)
+
+    chars = [ self._tile(pattern.tolist()) if pattern.any() else ' ' \
+                                                      for pattern in unique ]
+    tiles = tiles.reshape(lines, columns).tolist()
+    return '\n'.join(''.join(chars[tile] for tile in line) for line in tiles)
+
+
+  # Draws the canvas on its part of the LCD screen. The text around it is left
+  # as it is (see Display._draw())
+  # Only the glyphs of tiles that were not drawn before are loaded, and only
+  # the characters whose tile changed are written
+  def flush(self):
+    self._draw(self.column, self.line, self.text())
+
+
+  # Initializes a blank _Canvas, drawn with the tiles returned by 'tile' (see
+  # _Glyphs.tile()) and shown with 'draw' from 'column' of the 'line'-th line
+  # of the screen
+  # 'numpy' is the module to use, numpy by default
+  def __init__(self, columns, lines, column, line, tile, draw, numpy=None):
+    if numpy is None:
+      import numpy
+    self._numpy = numpy
+    self._tile = tile
+    self._draw = draw
+    self.columns = columns
+    self.lines = lines
+    self.column = column
+    self.line = line
+    self.pixels = numpy.zeros((lines * 8, columns * 5), dtype=bool)
+    self._weights = 1 << numpy.arange(4, -1, -1)
+
+
+# Class _Canvas END
+################################################################################
+
+
+import unicodedata
+
+
+# _Translator translates text into the characters of the character ROM of the
+# controller, each one standing for the code it is written with in DDRAM (its
+# ordinal). Translated strings are kept, so that text shown again costs
+# nothing to translate. A character the ROM does not have is looked up, in
+# turn:
+#   * among the glyphs registered under the character itself (see glyph())
+#   * as a character that looks like it, or the same letter without accents
+#     or in capitals, if the ROM has that one
+#   * among the glyphs that come with Dots, for Greek capitals and for the
+#     ASCII characters A00 lacks
+# and it is shown as '?' if it is not found
+class _Translator(object):
+
+  # Codes of the characters of each ROM that are not ASCII, or that differ
+  # from ASCII
+  __ROMS = {
+    ROM_A00: dict(
+      [ (u'\u00a5', 0x5c), (u'\u2192', 0x7e), (u'\u2190', 0x7f),
+        (u'\u00b0', 0xdf) ] +
+      # Half-width katakana, in the order of JIS X 0201
+      [ (_chr(0xff61 + i), 0xa1 + i) for i in range(0x3f) ] +
+      list(zip(u'\u03b1\u00e4\u03b2\u03b5\u03bc\u03c3\u03c1',
+               range(0xe0, 0xe7))) +
+      [ (u'\u221a', 0xe8), (u'\u00a2', 0xec), (u'\u00f1', 0xee),
+        (u'\u00f6', 0xef), (u'\u03b8', 0xf2), (u'\u221e', 0xf3),
+        (u'\u03a9', 0xf4), (u'\u00fc', 0xf5), (u'\u03a3', 0xf6),
+        (u'\u03c0', 0xf7), (u'\u5343', 0xfa), (u'\u4e07', 0xfb),
+        (u'\u5186', 0xfc), (u'\u00f7', 0xfd), (u'\u2588', 0xff) ]),
+    ROM_A02: dict(
+      list(zip(u'\u0411\u0414\u0416\u0417\u0418\u0419\u041b\u041f'
+               u'\u0423\u0426\u0427\u0428\u0429\u042a\u042b\u042d',
+               range(0x80, 0x90))) +
+      [ (u'\u03b1', 0x90), (u'\u266a', 0x91), (u'\u0393', 0x92),
+        (u'\u03c0', 0x93), (u'\u03a3', 0x94), (u'\u03c3', 0x95),
+        (u'\u03c4', 0x97), (u'\u0398', 0x99), (u'\u03a9', 0x9a),
+        (u'\u03b4', 0x9b), (u'\u221e', 0x9c), (u'\u2665', 0x9d),
+        (u'\u03b5', 0x9e), (u'\u2229', 0x9f), (u'\u042e', 0xac),
+        (u'\u042f', 0xad) ] +
+      # Mostly as in Latin-1
+      [ (_chr(code), code) for code in list(range(0xa1, 0xa8)) +
+                  [0xa9, 0xaa, 0xab, 0xae, 0xb0, 0xb1, 0xb2, 0xb3, 0xb5,
+                   0xb6, 0xb7, 0xb9, 0xba, 0xbb, 0xbc, 0xbd, 0xbe, 0xbf] +
+                  list(range(0xc0, 0x100)) ]) }
+
+  # ASCII characters each ROM does not have
+  __NOT_ASCII = { ROM_A00: u'\\~', ROM_A02: u'' }
+
+  # Characters that look like others
+  __LOOKALIKES = dict(
+    list(zip(u'\u0391\u0392\u0395\u0396\u0397\u0399\u039a\u039c'
+             u'\u039d\u039f\u03a1\u03a4\u03a5\u03a7\u03bf\u03b9'
+             u'\u03ba\u03bd\u03c1\u03c5\u03c7\u03c2',
+             u'ABEZHIKMNOPTYXoikvpuxs')) +
+    list(zip(u'\u0410\u0412\u0415\u041a\u041c\u041d\u041e\u0420'
+             u'\u0421\u0422\u0425\u0430\u0435\u043e\u0440\u0441'
+             u'\u0443\u0445',
+             u'ABEKMHOPCTXaeopcyx')) +
+    list(zip(u'\u2018\u2019\u201c\u201d\u2013\u2014\u00a0\u00b7',
+             u'\'\'""-- .')))
+
+  # Rows of dots of the glyphs that come with Dots
+  __GLYPHS = {
+    u'\u0393': [0x1f, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x00],
+    u'\u0394': [0x04, 0x04, 0x0a, 0x0a, 0x11, 0x11, 0x1f, 0x00],
+    u'\u0398': [0x0e, 0x11, 0x11, 0x1f, 0x11, 0x11, 0x0e, 0x00],
+    u'\u039b': [0x04, 0x0a, 0x0a, 0x11, 0x11, 0x11, 0x11, 0x00],
+    u'\u039e': [0x1f, 0x00, 0x00, 0x0e, 0x00, 0x00, 0x1f, 0x00],
+    u'\u03a0': [0x1f, 0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x00],
+    u'\u03a3': [0x1f, 0x10, 0x08, 0x04, 0x08, 0x10, 0x1f, 0x00],
+    u'\u03a6': [0x04, 0x0e, 0x15, 0x15, 0x15, 0x0e, 0x04, 0x00],
+    u'\u03a8': [0x15, 0x15, 0x15, 0x0e, 0x04, 0x04, 0x04, 0x00],
+    u'\u03a9': [0x0e, 0x11, 0x11, 0x11, 0x0a, 0x0a, 0x1b, 0x00],
+    u'\\':     [0x00, 0x10, 0x08, 0x04, 0x02, 0x01, 0x00, 0x00],
+    u'~':      [0x00, 0x00, 0x08, 0x15, 0x02, 0x00, 0x00, 0x00] }
+
+  # Selects the character ROM of the controller, ROM_A00 or ROM_A02
+  def set_rom(self, rom):
+    if rom not in self.__ROMS:
+      raise ValueError("Unknown character ROM: {}".format(rom))
+
+    self._table = self.__ROMS[rom]
+    self._not_ascii = self.__NOT_ASCII[rom]
+    self.forget()
+
+
+  # Returns 'text' translated into characters of the ROM, or glyphs
+  def translate(self, text):
+    translated = self._translations.pop(text, None)
+    if translated is None:
+      translated = ''.join(self._char(char) for char in text)
+      if len(self._translations) >= MAX_TRANSLATIONS:
+        self._translations.popitem(last=False)
+
+    self._translations[text] = translated
+    return translated
+
+
+  # Forgets the strings translated so far, so that they are translated again
+  # Called when glyphs are registered, since they may stand for characters
+  def forget(self):
+    self._translations = OrderedDict()
+
+
+  # Returns the character of the ROM, or the glyph, 'char' is shown as
+  # Bytes that are not ASCII (strings of Python 2 that are not unicode) stand
+  # for no character in particular, so they are shown as '?'
+  def _char(self, char):
+    if ord(char) < 0x80 and char not in self._not_ascii:
+      return char
+    if not isinstance(char, type(u'')):
+      return u'?'
+
+    code = self._table.get(char)
+    if code is not None:
+      return _chr(code)
+    if u'\ue000' <= char <= u'\uf8ff':
+      return char
+
+    glyph = self._glyphs.find(char)
+    if glyph is not None:
+      return glyph
+
+    for other in self._alternatives(char):
+      translated = self._char(other)
+      if translated != u'?':
+        return translated
+
+    if char in self.__GLYPHS:
+      return self._glyphs.register(char, self.__GLYPHS[char])
+    return u'?'
+
+
+  # Returns the characters that could stand for 'char': one that looks like
+  # it, the same letter without accents and the same letter in capitals
+  def _alternatives(self, char):
+    alternatives = [ self.__LOOKALIKES.get(char),
+                     unicodedata.normalize('NFD', char)[0],
+                     char.upper() ]
+    return [ other for other in alternatives \
+                              if other and len(other) == 1 and other != char ]
+
+
+  # Initializes the _Translator for ROM_A00, drawing the characters the ROM
+  # does not have with 'glyphs'
+  def __init__(self, glyphs):
+    self._glyphs = glyphs
+    self.set_rom(ROM_A00)
+
+
+# Class _Translator END
+################################################################################
+
+
+
+from collections import deque
+from contextlib import contextmanager
+from numbers import Integral
+from threading import Lock, local
+from ifc import HD44780
+
+
+# _Bus sends the instructions of every Display to their controllers, which may
+# share the rs, rw and DB pins. Instructions are sent one at a time, but while
+# a controller executes one, the next instruction is sent to another controller
+# that is ready for it, so the time one display is busy is spent feeding the
+# others instead of waiting. Frames of different displays that are written at
+# the same time (from different threads, or within interleaved()) are sent
+# interleaved this way
+class _Bus(object):
+
+  # Queues the (function of HD44780, argument) pairs of 'plan' to be sent to
+  # 'controller', in order, and returns once they are sent. Within
+  # interleaved() it returns right away, and they are sent when it ends
+  def write(self, controller, plan):
+    self.send(self.queue(controller, plan))
+
+
+  # Queues the (function of HD44780, argument) pairs of 'plan' to be sent to
+  # 'controller' after the ones queued before them, without waiting for the
+  # bus, and returns the ticket to send them with (see send())
+  def queue(self, controller, plan):
+    if controller is None:
+      raise ValueError("No controller to write to")
+    if not plan: return None
+
+    return self._queue(controller, plan)
+
+
+  # Returns once the instructions of 'ticket' (see queue()) are sent. Within
+  # interleaved() it returns right away, and they are sent when it ends
+  def send(self, ticket):
+    if ticket is None: return
+
+    tickets = getattr(self._local, 'tickets', None)
+    if tickets is None:
+      self._send([ ticket ])
+    else:
+      tickets += [ ticket ]
+
+
+  # Lets the plans written on the calling thread within the context be sent
+  # together, interleaved, when the context ends
+  @contextmanager
+  def interleaved(self):
+    if getattr(self._local, 'tickets', None) is not None:
+      yield
+      return
+
+    self._local.tickets = []
+    try:
+      yield
+    finally:
+      tickets, self._local.tickets = self._local.tickets, None
+      self._send(tickets)
+
+
+  # Calls function(*args) right away on the calling thread, once no other
+  # thread is sending, and returns what it returns. Instructions that must not
+  # be interleaved with others (initializing a controller, for instance) are
+  # sent this way, even within interleaved()
+  def run(self, function, *args):
+    self._condition.acquire()
+    while self._sending:
+      self._condition.wait()
+    self._sending = True
+    self._condition.release()
+
+    try:
+      return function(*args)
+    finally:
+      self._condition.acquire()
+      self._sending = False
+      self._condition.notify_all()
+      self._condition.release()
+
+
+  # Adds the instructions of 'plan' to the queue of 'controller'
+  # Returns a ticket that tells when all of them are sent
+  def _queue(self, controller, plan):
+    self._condition.acquire()
+
+    if controller not in self._queues:
+      self._queues[controller] = deque()
+    self._queues[controller].extend(plan)
+    self._queued[controller] = self._queued.get(controller, 0) + len(plan)
+    ticket = (controller, self._queued[controller])
+
+    self._condition.release()
+    return ticket
+
+
+  # Sends instructions until every instruction of 'tickets' is sent
+  # One thread sends at a time, and it sends the instructions queued by the
+  # rest of the threads as well, while they wait
+  def _send(self, tickets):
+    self._condition.acquire()
+
+    try:
+      while not self._all_sent(tickets):
+        if self._sending:
+          self._condition.wait()
+          continue
+
+        self._sending = True
+        self._condition.release()
+        try:
+          self._drive(tickets)
+        finally:
+          self._condition.acquire()
+          self._sending = False
+          self._condition.notify_all()
+    finally:
+      self._condition.release()
+
+
+  # Returns True if every instruction of 'tickets' is sent
+  def _all_sent(self, tickets):
+    return all(self._sent.get(controller, 0) >= queued \
+                                          for controller, queued in tickets)
+
+
+  # Sends the queued instructions until every instruction of 'tickets' is sent
+  # Instructions that fail are dropped, along with the rest of the ones taken
+  # off the queue with them
+  def _drive(self, tickets):
+    while True:
+      self._condition.acquire()
+      if self._all_sent(tickets):
+        self._condition.release()
+        return
+      controller, steps, count = self._take()
+      self._condition.release()
+
+      try:
+        if HD44780.selected() is not controller:
+          HD44780.select(controller)
+        for instruct, argument in steps:
+          instruct(argument)
+      finally:
+        self._condition.acquire()
+        self._sent[controller] = self._sent.get(controller, 0) + count
+        self._condition.release()
+
+
+  # Takes the next instructions to send off the queues
+  # If only one controller has instructions queued, all of them are taken.
+  # Otherwise one instruction is taken, of the first controller that is ready
+  # for it, or else of the one that will be ready the soonest. Texts are
+  # written one character at a time and the controller goes last in turn, so
+  # that no controller waits for the whole frame of another
+  # Returns the controller, the (function, argument) pairs taken and how many
+  # of the queued instructions they complete
+  def _take(self):
+    queues = self._queues
+
+    if len(queues) == 1:
+      controller, queue = queues.popitem()
+      return controller, queue, len(queue)
+
+    controller = min(queues, key=self._ready_in)
+    queue = queues.pop(controller)
+    instruct, argument = queue.popleft()
+    count = 1
+
+    if instruct is HD44780.write and len(argument) > 1:
+      queue.appendleft( (instruct, argument[1:]) )
+      argument, count = argument[:1], 0
+
+    if queue:
+      queues[controller] = queue
+    return controller, [ (instruct, argument) ], count
+
+
+  # Returns how many seconds are left until 'controller' is ready
+  def _ready_in(self, controller):
+    HD44780.select(controller)
+    return HD44780.ready_in()
+
+
+  # Initializes the _Bus
+  def __init__(self):
+    self._condition = Condition()
+    self._queues = OrderedDict()
+    self._queued = {}
+    self._sent = {}
+    self._sending = False
+    self._local = local()
+
+
+# Class _Bus END
+################################################################################
+
+
+# _Writer writes the frames of the displays from a single background thread,
+# so that the text of a display is changed as soon as it is parsed, however
+# long it takes to send it on the bus. Frames requested while others are
+# being written are merged: each display that has frames requested gets one
+# frame, of its newest contents, and the frames of different displays are sent
+# interleaved (see _Bus)
+class _Writer(object):
+
+  # Requests a frame of 'display' to be written (see Display._write_frame())
+  # Within together() the request is held until the context ends
+  def request(self, display):
+    held = getattr(self._local, 'held', None)
+    if held is None:
+      self._request([ display ])
+    else:
+      held[display] = True
+
+
+  # Holds the frames requested on the calling thread within the context, and
+  # requests them all at once when it ends, so that they are written together.
+  # Instructions written on the bus within the context are sent together as
+  # well (see _Bus.interleaved())
+  @contextmanager
+  def together(self):
+    if getattr(self._local, 'held', None) is not None:
+      yield
+      return
+
+    self._local.held = OrderedDict()
+    try:
+      with self._bus.interleaved():
+        yield
+    finally:
+      held, self._local.held = self._local.held, None
+      self._request(held)
+
+
+  # Returns once every frame of 'display' requested so far is written
+  def flush(self, display):
+    self._condition.acquire()
+    while display in self._requested or display in self._writing:
+      self._condition.wait()
+    self._condition.release()
+
+
+  # Adds 'displays' to the ones that have frames requested and wakes the thread
+  # up (starting it with the first request)
+  def _request(self, displays):
+    if not displays: return
+    self._condition.acquire()
+
+    for display in displays:
+      self._requested[display] = True
+    if not self._thread:
+      self._thread = Thread(target=self._run)
+      self._thread.daemon = True
+      self._thread.start()
+    self._condition.notify_all()
+
+    self._condition.release()
+
+
+  # Waits for frames to be requested and writes them, forever
+  def _run(self):
+    while True:
+      self._condition.acquire()
+      while not self._requested:
+        self._condition.wait()
+      displays = list(self._requested)
+      self._requested.clear()
+      self._writing = set(displays)
+      self._condition.release()
+
+      # A failing frame must not stop the frames of every other display. The
+      # error is kept by the display, to be raised on the thread that uses it
+      try:
+        with self._bus.interleaved():
+          self._write_frames(displays)
+      except Exception as error:
+        for display in displays:
+          display._error = error
+
+      self._condition.acquire()
+      self._writing = set()
+      self._condition.notify_all()
+      self._condition.release()
+
+
+  # Writes a frame of each one of 'displays', in order
+  # The error of a failing frame is kept by its display (see
+  # Display._raise_error())
+  def _write_frames(self, displays):
+    for display in displays:
+      try:
+        display._write_frame()
+      except Exception as error:
+        display._error = error
+
+
+  # Initializes the _Writer of the displays driven through 'bus'
+  # Its thread starts with the first request
+  def __init__(self, bus):
+    self._bus = bus
+    self._condition = Condition()
+    self._requested = OrderedDict()
+    self._writing = set()
+    self._thread = None
+    self._local = local()
+
+
+# Class _Writer END
+################################################################################
+
+
+# Display drives one LCD screen: it owns the _Buffer of the text shown on it,
+# the number of lines and characters of the screen, the lock its contents are
+# changed and its frames are planned under and the handle of the controller
+# (see HD44780.init()). Any number of displays can be driven at the same time,
+# each one with its own controller, through pins that the controllers share
+# (every pin but 'e')
+# Changing the text only requests a frame, which the _Writer writes in the
+# background, so no method waits for the bus (see flush())
+# The functions of the module drive the default display (see default_display())
+class Display(object):
+
+  # Displays of the process send their instructions through the same _Bus
+  _bus = _Bus()
+
+  # The frames of every display are written on the thread of the same _Writer
+  _writer = _Writer(_bus)
+
+  # The scheduler runs all of the scrollers of every display that scroll every
+  # number of seconds. Frames due at the same time are written together
+  _scheduler = _Scheduler(_writer.together)
+
+  # DDRAM addresses at which each line of the LCD screen starts
+  __LINE_ADDRESSES = [0x00, 0x40]
+
+  # Number of DDRAM addresses in the row of each line, in 2-line mode. The
+  # display shifts around the row, so it acts as a ring of characters only
+  # 'columns' of which are shown on the screen. In 1-line mode the only row
+  # is twice as long
+  __ROW_SPAN = 0x28
+
+  # Rows of dots of the tiles widgets are drawn with. Rows of the big digits
+  # are filled at the top, at the bottom or both, so that the middle of a digit
+  # falls between the two lines of the screen
+  __FULL_TILE = [0x1f] * 8
+  __TOP_TILE = [0x1f] * 3 + [0x00] * 5
+  __BOTTOM_TILE = [0x00] * 5 + [0x1f] * 3
+  __TOP_BOTTOM_TILE = [0x1f] * 3 + [0x00] * 2 + [0x1f] * 3
+
+  # The top and the bottom row of each big digit, in tiles: 'F' for a full
+  # tile, 'T' for the top tile, 'B' for the bottom tile and 'M' for the tile
+  # that has both. Other characters are shown as they are
+  __BIG_DIGITS = {
+    '0': ("FTF", "FBF"), '1': ("TF ", "BFB"), '2': ("MMF", "FBB"),
+    '3': ("MMF", "BBF"), '4': ("FBF", "  F"), '5': ("FMM", "BBF"),
+    '6': ("FMM", "FBF"), '7': ("TTF", "  F"), '8': ("FMF", "FBF"),
+    '9': ("FMF", "BBF"), '-': ("BBB", "   "), ' ': ("   ", "   "),
+    '.': (" ", "."),     ':': (".", ".") }
+
+
+  # Initializes the controller and turns the display on
+  # A transport other than the default one (see ifc.Transport) can be given to
+  # change the way instructions are carried to the controller. Displays whose
+  # controllers share every pin but 'e' can share the same transport
+  # The error of a frame that failed before is dropped, as the controller is
+  # initialized over again
+  def init(self, pins=None, lines=None, transport=None):
+    self._writer.flush(self)
+    self.lock.acquire()
+
+    try:
+      self._error = None
+      lines = lines or self.lines
+      self._check_size(lines, self.columns)
+      self.lines = lines
+      self._controller = self._bus.run(self._init_controller, pins, transport)
+      self._reset_shadow()
+      self._glyphs.unload()
+    finally:
+      self.lock.release()
+
+
+  # Clears the display of all text
+  # A frame requested before and not written yet is not written any more
+  # The instruction is sent once the lock is released, so that the text can
+  # change meanwhile, without waiting for the bus
+  def clear(self):
+    self.lock.acquire()
+
+    try:
+      self._frame_requested = False
+      ticket = self._instruct(HD44780.clear)
+      self._reset_shadow()
+    finally:
+      self.lock.release()
+
+    self._bus.send(ticket)
+
+
+  # Displays the given text on the LCD screen
+  # The text is saved and parsed in ythe _Buffer. You can provide an unlimited
+  # number of characters and lines. You can use the '\t' character to split a
+  # line into different cells and then set_tab_stops() to format their width.
+  # If 'lazy' is True, lines are only parsed when they are first accessed, and
+  # at most MAX_RESIDENT_LINES of them are kept parsed, so that very long texts
+  # display as fast as short ones
+  # The text is parsed into a back buffer, which is swapped in all at once, and
+  # the frame is written in the background, so this returns without waiting
+  # for the bus. Frames of texts displayed in a quick burst are merged, and
+  # only the newest text is written
+  def display(self, text, lazy=False):
+    self._check_init()
+    self._locked(self._swap_buffer, self._buffer.prepare(text, lazy))
+    self._rewrite()
+
+
+  # Displays the lines of the file at 'path' on the LCD screen
+  # The file is mapped in memory instead of being read, and its lines are
+  # parsed lazily, so files of any size display as fast as short ones. If
+  # 'follow' is given, the file is checked every 'follow' seconds for lines
+  # appended to it, as with `tail -f`. While the last lines of the file are on
+  # the screen, the screen scrolls along to show the new ones
+  def display_file(self, path, follow=None):
+    self._check_init()
+    self._locked(self._swap_buffer, self._buffer.prepare_file(path))
+    self._rewrite()
+
+    if follow:
+      self._follow(self._scheduler.clock(), follow, self._following)
+
+
+  # Appends more lines of text at the end of the text on the LCD screen
+  # Only the new lines are parsed, so lines can be appended to a long running
+  # _Buffer (of log messages, for example) as fast as to a short one
+  def append(self, text):
+    self._locked(self._buffer.append, text)
+    self._rewrite()
+
+
+  # Inserts more lines of text before the line at 'index' in the _Buffer
+  def insert(self, index, text):
+    self._locked(self._buffer.insert, index, text)
+    self._rewrite()
+
+
+  # Removes 'count' many lines of text from the _Buffer, starting at 'index'
+  def remove(self, index, count=1):
+    self._locked(self._buffer.remove, index, count)
+    self._rewrite()
+
+
+  # Replaces the text of the _Line at 'index' in the _Buffer, keeping its tab
+  # stops and how it is scrolled (see _Line.set_text())
+  # Only the characters that changed on the screen are written again
+  def update_line(self, index, text):
+    self._locked(self._buffer.update, index, text)
+    self._rewrite()
+
+
+  # Replaces the text of the given _Cell, keeping its width and how it is
+  # scrolled (see _Cell.set_text())
+  # Only the characters that changed on the screen are written again
+  def update_cell(self, cell, text):
+    self._locked(cell.set_text, text)
+    self._rewrite()
+
+
+  # Formats the string currently displayed on the screen
+  # tab_stops are used to divide the screen into multiple parts (columns).
+  # These columns will display text in their own width and scroll
+  # independently. You can change between columns using the \t character when
+  # you provide the string to be written on the LCD
+  # Future development will include text alignment options
+  def format(self, tab_stops):
+    self._locked(self._set_tab_stops, tab_stops)
+    self._rewrite()
+
+
+  # Shows or hides the cursor on the screen
+  def cursor(self, flags):
+    self.lock.acquire()
+
+    try:
+      ticket = self._instruct(HD44780.display_on,
+                              bool(flags & CURSOR_VISIBLE),
+                              bool(flags & CURSOR_BLINK))
+    finally:
+      self.lock.release()
+
+    self._bus.send(ticket)
+
+
+  # Registers a custom 5x8 dot pattern (a glyph) under 'name', or changes the
+  # pattern of the glyph already registered under it. If 'pattern' is left
+  # blank, the glyph registered under 'name' is looked up instead
+  # Returns the character that stands for the glyph, to be used in the text.
+  # Any number of glyphs can be registered, and up to 8 of them can be on the
+  # screen at the same time. Glyphs are loaded in the controller as they come
+  # on the screen, so a changed pattern is shown right away
+  def glyph(self, name, pattern=None):
+    if pattern is None:
+      return self._glyphs.char(name)
+
+    char = self._locked(self._register_glyph, name, pattern)
+    if self._glyphs.is_loaded(char):
+      self._rewrite()
+    return char
+
+
+  # Selects the character ROM the controller has, ROM_A00 (most controllers)
+  # or ROM_A02, so that text is shown with the characters of that ROM.
+  # Characters the ROM does not have are shown as characters that look like
+  # them, or with glyphs (Greek capitals come with Dots, and glyphs registered
+  # under a character draw that character)
+  def set_rom(self, rom):
+    self._locked(self._translator.set_rom, rom)
+    self._rewrite()
+
+
+  # Returns the text that draws the characters of 'text' as big digits, two
+  # lines tall and three characters wide, with a blank between them. Digits,
+  # '-', ' ', '.' and ':' can be drawn
+  # Only four tiles are used for all of the digits, so they take half of CGRAM
+  def big_digits(self, text):
+    tiles = { 'F': self._tile(self.__FULL_TILE),
+              'T': self._tile(self.__TOP_TILE),
+              'B': self._tile(self.__BOTTOM_TILE),
+              'M': self._tile(self.__TOP_BOTTOM_TILE) }
+
+    rows = [ [], [] ]
+    for char in str(text):
+      if char not in self.__BIG_DIGITS:
+        raise ValueError("Cannot draw '{}' as a big digit".format(char))
+      for row, drawn in zip(rows, self.__BIG_DIGITS[char]):
+        row += [ ''.join(tiles.get(tile, tile) for tile in drawn) ]
+
+    return '\n'.join(' '.join(row) for row in rows)
+
+
+  # Returns the text that draws a horizontal bar 'width' characters long (the
+  # width of the screen, by default), filled from the left in proportion to
+  # 'value' (0 to 1), one column of dots at a time
+  # The bar is drawn with the full tile and at most one partly filled tile
+  def hbar(self, value, width=None):
+    width = width or self.columns
+    columns = int(min(max(value, 0), 1) * width * 5 + 0.5)
+    full, partial = divmod(columns, 5)
+
+    bar = self._tile(self.__FULL_TILE) * full
+    if partial:
+      row = (0x1f << (5 - partial)) & 0x1f
+      bar += self._tile([row] * 8)
+    return bar.ljust(width)
+
+
+  # Returns the text that draws a vertical bar for each of 'values' (0 to 1),
+  # side by side, each one 'height' lines tall (the lines of the screen, by
+  # default) and filled from the bottom, one row of dots at a time
+  # Partly filled tiles are shared between bars of the same level, so that any
+  # number of bars takes at most 8 tiles
+  def vbars(self, values, height=None):
+    height = height or self.lines
+    levels = [ int(min(max(value, 0), 1) * height * 8 + 0.5) \
+                                                          for value in values ]
+
+    lines = []
+    for line in range(height):
+      bottom = (height - 1 - line) * 8
+      chars = ''
+      for level in levels:
+        rows = min(max(level - bottom, 0), 8)
+        chars += self._tile([0x00] * (8 - rows) + [0x1f] * rows) \
+                                                              if rows else ' '
+      lines += [ chars ]
+
+    return '\n'.join(lines)
+
+
+  # Returns a _Canvas of 'columns' characters by 'lines' lines, to draw on dot
+  # by dot, over the part of the screen from 'column' of the 'line'-th line
+  # on (the rest of the screen, by default). Needs NumPy
+  def canvas(self, columns=None, lines=None, column=0, line=0):
+    columns = columns or self.columns - column
+    lines = lines or self.lines - line
+    if not (0 <= column and 0 < columns and column + columns <= self.columns \
+        and 0 <= line and 0 < lines and line + lines <= self.lines):
+      raise ValueError("A canvas of {}x{} characters at ({}, {}) does not fit "
+                       "on the screen".format(columns, lines, column, line))
+
+    return _Canvas(columns, lines, column, line, self._tile, self._draw)
+
+
+  # Returns a specific _Scroller instance acording to the type of the parameter
+  # given
+  def scroll(self, what=None):
+
+    if isinstance(what, _Line):
+      return _LineScroller(what, self._rewrite, self._background_rewrite,
+                           self._scheduler, self.lock)
+    elif isinstance(what, _Cell):
+      return _CellScroller(what, self._rewrite, self._background_rewrite,
+                           self._scheduler, self.lock)
+    else:
+      return _ScreenScroller(self._buffer, self._rewrite,
+                             self._background_rewrite, self._scheduler,
+                             self.lock)
+
+
+  # Returns the inner _Buffer object
+  def buffer(self):
+    return self._buffer
+
+
+  # Gets a _Line form the inner _Buffer
+  # If provided with an 'index' it returns the _Line at that index in the
+  # buffer. If provided with an 'offset' it returns the _Line that is 'offset'
+  # many places away from the current _Line on the LCD screen
+  # If nothing is provided it returns the current _Line
+  def line(self, index=None, offset=None):
+
+    if index is not None:
+      return self._buffer[index]
+    elif offset:
+      return self._buffer[ self._buffer._current_line_index + offset ]
+    else:
+      return self._buffer.line()
+
+
+  # Initializes the controller of the display and turns the display on
+  # Returns the handle of the controller
+  def _init_controller(self, pins, transport):
+    controller = HD44780.init(pins, transport)
+    HD44780.set_function( bit_mode = HD44780.bit_mode(),
+                          num_lines = self.lines   )
+    HD44780.display_on()
+    return controller
+
+
+  # Queues the instruction of the HD44780 'function' with 'args' to be sent to
+  # the controller, after the frames written before it, and returns the ticket
+  # to send it with (see _Bus.send()). Called under the lock, so that the
+  # instruction keeps its place among the frames, while it is sent once the
+  # lock is released
+  def _instruct(self, function, *args):
+    self._check_init()
+    return self._bus.queue(self._controller,
+                           [ (lambda args: function(*args), args) ])
+
+
+  # Adds the lines appended to the followed file and checks it again after
+  # 'seconds'. 'run' tells which call to display_file() started following, so
+  # that a file that is no longer displayed is not followed any more
+  def _follow(self, due, seconds, run):
+    if run != self._following: return
+    buffer = self._buffer
+
+    self.lock.acquire()
+    try:
+      at_bottom = buffer._current_line_index + self.lines >= \
+                                                          buffer.line_count()
+      added = buffer.refresh()
+      if added and at_bottom:
+        buffer.scroll_to(max(buffer.line_count() - self.lines, 0))
+    finally:
+      self.lock.release()
+
+    if added:
+      self._background_rewrite()
+
+    self._scheduler.schedule(due + seconds,
+                             lambda due: self._follow(due, seconds, run))
+
+
+  # Stops following the file displayed by display_file(), if any, and closes
+  # it, since other lines are about to be displayed
+  def _stop_following(self):
+    self._following += 1
+    self._buffer.close()
+
+
+  # Puts 'lines' prepared by the _Buffer (see _Buffer.prepare()) in it, in the
+  # place of the lines displayed so far. Called under the lock
+  def _swap_buffer(self, lines):
+    self._stop_following()
+    self._buffer.swap(lines)
+
+
+  # Sets the tab stops of the lines in the _Buffer, as described in format()
+  # Lines added to the _Buffer later on get the same tab stops
+  def _set_tab_stops(self, tab_stops):
+
+    if tab_stops:
+      if all(isinstance(x, Integral) for x in tab_stops):
+        def formatter(index, line):
+          line.set_tab_stops(tab_stops)
+      elif len(tab_stops) == len(self._buffer):
+        def formatter(index, line):
+          if index < len(tab_stops):
+            line.set_tab_stops(tab_stops[index])
+      else:
+        by_count = dict((len(n_tab_stops), n_tab_stops) \
+                                              for n_tab_stops in tab_stops)
+        def formatter(index, line):
+          if line.cell_count() - 1 in by_count:
+            line.set_tab_stops(by_count[ line.cell_count() - 1 ])
+
+      self._buffer.format_lines(formatter)
+
+
+  # Registers 'pattern' under 'name' and returns the character of the glyph
+  # A glyph registered under a character draws that character wherever the
+  # ROM does not have it, so the strings translated so far are translated
+  # again
+  def _register_glyph(self, name, pattern):
+    char = self._glyphs.register(name, pattern)
+    self._translator.forget()
+    return char
+
+
+  # Draws the lines of 'text' over the screen, from 'column' of its 'line'-th
+  # line on, leaving the text around them as it is: each _Line drawn over is
+  # given the text the screen shows on it, with the new characters in their
+  # place, and _Lines are added where the screen shows none (see _Canvas)
+  def _draw(self, column, line, text):
+    self._check_init()
+    self._locked(self._draw_rows, column, line, text.split('\n'))
+    self._rewrite()
+
+
+  # Draws 'rows' of text as described in _draw(). Called under the lock
+  # The _Lines drawn over keep no tab stops, so that they show the text as it
+  # is given
+  def _draw_rows(self, column, line, rows):
+    buffer = self._buffer
+    start = buffer._current_line_index + line
+    while buffer.line_count() < start + len(rows):
+      buffer.append('')
+
+    for index, row in enumerate(rows, start):
+      shown = self._format_line(buffer[index])
+      buffer.update(index, shown[:column] + row + shown[column + len(row):])
+      buffer[index].set_tab_stops([])
+
+
+  # Returns the character of the tile that draws 'pattern' (see _Glyphs.tile())
+  def _tile(self, pattern):
+    return self._locked(self._glyphs.tile, pattern)
+
+
+  # Calls function(*args) under the lock of the display and returns what it
+  # returns, so that no frame is planned while the contents are changing
+  def _locked(self, function, *args):
+    self.lock.acquire()
+
+    try:
+      return function(*args)
+    finally:
+      self.lock.release()
+
+
+  # Returns the number of DDRAM addresses in the row of each line, on a screen
+  # of 'lines' lines (the lines of the display, by default)
+  def _row_span(self, lines=None):
+    lines = lines or self.lines
+    return self.__ROW_SPAN if lines > 1 else 2 * self.__ROW_SPAN
+
+
+  # Raises ValueError unless a display can have 'lines' lines of 'columns'
+  # characters
+  def _check_size(self, lines, columns):
+    if lines not in (1, 2):
+      raise ValueError("A display has either 1 or 2 lines")
+    if columns < 1 or columns > self._row_span(lines):
+      raise ValueError("A display of {} lines has 1 to {} characters per line"\
+                                          .format(lines, self._row_span(lines)))
+
+
+  # Raises RuntimeError unless the controller of the display was initialized
+  # with init(), so that nothing is written before there is a controller to
+  # write it to
+  def _check_init(self):
+    if self._controller is None:
+      raise RuntimeError("Display is not initialized, call init() first")
+
+
+  # Resets the shadow copy of the DDRAM rows of the LCD screen and of the
+  # display shift (how many characters the rows are shifted to the left)
+  # The shadow holds one string of _row_span() characters per line and lets
+  # _rewrite() send only the characters that changed since the last frame,
+  # instead of clearing and writing the whole screen over again
+  def _reset_shadow(self):
+    self._shadow = [ ' ' * self._row_span() for i in range(self.lines) ]
+    self._shift = 0
+
+
+  # Requests a frame that shows the current contents of the _Buffer, to be
+  # written by the _Writer in the background, and returns right away
+  # Unless 'report' is False (for frames requested in the background), the
+  # error of a frame that failed since the last call is raised, once the new
+  # frame is requested
+  def _rewrite(self, report=True):
+    self._check_init()
+    self._frame_requested = True
+    self._writer.request(self)
+    if report: self._raise_error()
+
+
+  # Requests a frame as _rewrite() does, leaving the error of a frame that
+  # failed to the thread that uses the display. Frames requested in the
+  # background are requested through this method, which is the same job every
+  # time, so that the _Scheduler merges them (see _Scheduler.throttle())
+  def _background_rewrite(self):
+    self._rewrite(report=False)
+
+
+  # Raises the error of the last frame that failed to be written in the
+  # background (see _Writer), if there is one, and forgets it
+  def _raise_error(self):
+    error, self._error = self._error, None
+    if error is not None:
+      raise error
+
+
+  # Writes as many formatted _Lines from the _Buffer as the screen has lines
+  # (if there are enough) to the LCD screen, if a frame was requested since
+  # the last one. Only the characters that differ from the shadow copy of the
+  # screen are sent to the controller, so nothing is cleared and a frame that
+  # changes a few characters costs only a few instructions
+  # The frame is planned under the lock, so that the contents do not change
+  # halfway through, and sent once the lock is released when called by the
+  # _Writer (within _Bus.interleaved())
+  def _write_frame(self):
+    self.lock.acquire()
+
+    try:
+      if self._frame_requested:
+        self._frame_requested = False
+        self._bus.write(self._controller, self._plan_frame())
+    finally:
+      self.lock.release()
+
+
+  # Returns once every frame requested so far is written on the screen
+  # Frames are written in the background, so this is only needed to wait for
+  # the screen to show the changes made so far (before reading a virtual
+  # controller back, for instance)
+  # Raises the error of a frame that failed to be written, if there is one
+  def flush(self):
+    self._writer.flush(self)
+    self._raise_error()
+
+
+  # Returns the instructions that show the next frame on the LCD screen, as
+  # (function of HD44780, argument) pairs, and updates the shadow copy of the
+  # screen as if they were already sent
+  # Lines that fit whole in their DDRAM row are laid out whole, so that
+  # scrolling them later is nothing more than shifting the display. Otherwise,
+  # the characters shown at the current display shift are written over
+  def _plan_frame(self):
+    span = self._row_span()
+    lines = [ self.line(offset=offset) for offset in range(self.lines) ]
+    texts = [ self._translator.translate(self._format_line(l)) for l in lines ]
+
+    shift, rows = self._shifted_rows(lines, texts, span) or \
+                  (self._shift, self._windowed_rows(texts, span))
+
+    # Glyphs are loaded before the characters that show them are written
+    plan, rows, codes = self._glyphs.place(rows)
+    for index, row in enumerate(rows):
+      for start, end in self._changed_runs(self._shadow[index], row):
+        plan += [ (HD44780.set_ddram_address,
+                                      self.__LINE_ADDRESSES[index] + start),
+                  (HD44780.write, self._encode(row[start:end], codes)) ]
+
+    # Shift after writing, so that the characters shifted in are already there
+    left = (shift - self._shift) % span
+    if left <= span - left:
+      plan += [ (HD44780.shift_display, "left") ] * left
+    else:
+      plan += [ (HD44780.shift_display, "right") ] * (span - left)
+
+    self._shadow, self._shift = rows, shift
+    return plan
+
+
+  # Returns the display shift and the DDRAM rows that show 'texts' on the
+  # screen with every one of the 'lines' laid out whole on its row, or None if
+  # that is not possible. The display shift moves all of the lines together,
+  # so lines that are not blank must be scrolled by the same number of
+  # characters
+  def _shifted_rows(self, lines, texts, span):
+    shift, rows = None, []
+
+    for line, text in zip(lines, texts):
+      if not line or len(line) > span:
+        if text.strip(): return None
+        rows += [ ' ' * span ]
+        continue
+
+      contents, offset = line._laid_out_contents()
+      contents = self._translator.translate(contents)
+      if shift not in (None, offset): return None
+      shift = offset
+      rows += [ contents.ljust(span) ]
+
+    if shift is None:
+      return None
+
+    # Characters past the end of the row wrap around to its start
+    for row, text in zip(rows, texts):
+      if (row + row)[shift : shift + self.columns] != text: return None
+
+    return shift, rows
+
+
+  # Returns the shadow DDRAM rows with 'texts' written over the characters
+  # shown on the screen at the current display shift
+  def _windowed_rows(self, texts, span):
+    rows = []
+
+    for row, text in zip(self._shadow, texts):
+      row = list(row)
+      for i, char in enumerate(text):
+        row[ (self._shift + i) % span ] = char
+      rows += [ ''.join(row) ]
+
+    return rows
+
+
+  # Returns the exact characters the given _Line occupies on the line of the
+  # LCD screen. Lines past the end of the buffer and empty lines are blank
+  def _format_line(self, line):
+    formatted = line._format_contents() if line else None
+    return (formatted or '').ljust(self.columns)[:self.columns]
+
+
+  # Returns 'text' as it is written in DDRAM: each glyph in 'codes' is
+  # replaced by the code of its slot
+  @staticmethod
+  def _encode(text, codes):
+    if not codes and isinstance(text, str):
+      return text
+    return [ codes[char] if char in codes else ord(char) for char in text ]
+
+
+  # Returns the [start, end) ranges of characters that differ between the
+  # 'old' and the 'new' string of the same length
+  # Runs that are only one unchanged character apart are merged, because
+  # writing that character costs no more than setting the DDRAM address again
+  @staticmethod
+  def _changed_runs(old, new):
+    runs = []
+    if old == new: return runs
+
+    for i in range(len(new)):
+      if old[i] != new[i]:
+        if runs and i - runs[-1][1] <= 1:
+          runs[-1][1] = i + 1
+        else:
+          runs += [ [i, i + 1] ]
+
+    return runs
+
+
+  # Initializes a Display of 'lines' lines (1 or 2) of 'columns' characters
+  # Its controller is initialized with init(), before anything is written
+  def __init__(self, lines=LCD_LINES, columns=CHARS_PER_LINE):
+    self._check_size(lines, columns)
+    self.lines = lines
+    self.columns = columns
+
+    # Create a lock to secure the contents of the display, because they are
+    # changed by the caller and the scrollers while the _Writer plans frames
+    # of them on its own thread
+    self.lock = Lock()
+
+    # The buffer is used to internally hold and manipulate the string that
+    # is currently shown on the LCD
+    self._buffer = _Buffer(self)
+
+    # The custom glyphs that can be shown in the text (see glyph())
+    self._glyphs = _Glyphs()
+
+    # Translates the text into the characters of the ROM of the controller
+    self._translator = _Translator(self._glyphs)
+
+    # Counts the times a followed file stopped being displayed (see
+    # display_file())
+    self._following = 0
+
+    # Whether a frame was requested and not written yet (see _rewrite())
+    self._frame_requested = False
+
+    # The error of the last frame that failed to be written, until it is
+    # raised (see _raise_error())
+    self._error = None
+
+    self._controller = None
+    self._reset_shadow()
+
+
+# Class Display END
+################################################################################
+
+
 from sys import modules
 
 # Get a pointer to this module
 this = modules[__name__]
 
 
-# The buffer is used to internally hold and manipulate
-# the string that is currently shown on the LCD
-this.__buffer = _Buffer()
+# The display the functions of the module drive
+this.__default = Display()
 
 
-from ifc import HD44780
+# The lock the contents of the default display are changed and its frames
+# are planned under
+lock = this.__default.lock
 
 
-# Initializes controller and turns the display on
-def init(pins=None, lines=None):
+# Initializes controller and turns the display on (see Display.init())
+def init(pins=None, lines=None, transport=None):
   global LCD_LINES
-  LCD_LINES = lines or LCD_LINES
+  this.__default.init(pins, lines or LCD_LINES, transport)
+  LCD_LINES = this.__default.lines
+
 
-  HD44780.init(pins)
-  HD44780.set_function( bit_mode = len(HD44780.__pins['db']),
-                        num_lines = LCD_LINES   )
-  HD44780.display_on()
+# Returns the Display the functions of the module drive
+def default_display():
+  return this.__default
+
+
+# Lets the frames requested on the calling thread within the context be
+# written together when it ends, so that the instructions sent to the
+# controllers of different displays are interleaved: while one controller is
+# busy, the next instruction is sent to another one
+# Usage: with Dots.interleaved(): top.display(...); bottom.display(...)
+def interleaved():
+  return Display._writer.together()
+
+
+# Returns once every frame of the default display requested so far is written
+# on the screen (see Display.flush())
+def flush():
+  this.__default.flush()
 
 
 # Clears the display of all text
 def clear():
-  HD44780.clear()
+  this.__default.clear()
+
+
+# Displays the given text on the LCD screen (see Display.display())
+def display(text, lazy=False):
+  this.__default.display(text, lazy)
+
+
+# Displays the lines of the file at 'path' on the LCD screen, following it
+# every 'follow' seconds if given (see Display.display_file())
+def display_file(path, follow=None):
+  this.__default.display_file(path, follow)
+
+
+# Appends more lines of text at the end of the text on the LCD screen
+def append(text):
+  this.__default.append(text)
+
+
+# Inserts more lines of text before the line at 'index' in the _Buffer
+def insert(index, text):
+  this.__default.insert(index, text)
+
+
+# Removes 'count' many lines of text from the _Buffer, starting at 'index'
+def remove(index, count=1):
+  this.__default.remove(index, count)
+
 
+# Replaces the text of the _Line at 'index' in the _Buffer (see Display)
+def update_line(index, text):
+  this.__default.update_line(index, text)
 
-# Displays the given text on the LCD screen
-# The text is saved and parsed in ythe _Buffer. You can provide an unlimited
-# number of characters and lines. You can use the '\t' character to split a
-# line into different cells and then set_tab_stops() to format their width.
-def display(text):
-  this.__buffer.parse(text)
-  __rewrite()
 
+# Replaces the text of the given _Cell (see Display)
+def update_cell(cell, text):
+  this.__default.update_cell(cell, text)
 
-# Formats the string currently displayed on the screen
-# tab_stops are used to divide the screen into multiple parts (columns). These
-# columns will display text in their own width and scroll independently. You
-# can change between columns using the \t character when you provide the string
-# to be written on the LCD
-# Future development will include text alignment options
+
+# Formats the string currently displayed on the screen (see Display.format())
 def format(tab_stops):
+  this.__default.format(tab_stops)
 
-  if tab_stops:
-    if all(isinstance(x, (int, long)) for x in tab_stops):
-      for line in this.__buffer:
-        line.set_tab_stops(tab_stops)
-    elif len(tab_stops) == len(this.__buffer):
-      for line in this.__buffer:
-        line.set_tab_stops(tab_stops[ this.__buffer._current_line_index ])
-    else:
-      for n_tab_stops in tab_stops:
-        n = len(n_tab_stops)
-        for line in this.__buffer:
-          if line.cell_count() - 1 == n:
-            line.set_tab_stops(n_tab_stops)
-  
-  __rewrite()
+
+# Sets the most frames per second written on the LCD screen while scrolling
+# Lower rates keep the bus less busy when many scrollers tick at once
+def set_max_fps(fps):
+  global MAX_FPS
+  MAX_FPS = fps
 
 
 # Shows or hides the cursor on the screen
 def cursor(flags):
-  HD44780.display_on( flags & CURSOR_VISIBLE,
-                      flags & CURSOR_BLINK )
+  this.__default.cursor(flags)
 
 
-# Returns a specific _Scroller instance acording to the type of the parameter
-# given
-def scroll(what=None):
+# Registers a custom 5x8 dot pattern under 'name', or looks up the glyph
+# registered under it (see Display.glyph())
+def glyph(name, pattern=None):
+  return this.__default.glyph(name, pattern)
 
-  if isinstance(what, _Line):
-    return _LineScroller(what, __rewrite)
-  elif isinstance(what, _Cell):
-    return _CellScroller(what, __rewrite)
-  else:
-    return _ScreenScroller(this.__buffer, __rewrite)
 
+# Selects the character ROM the controller has (see Display.set_rom())
+def set_rom(rom):
+  this.__default.set_rom(rom)
 
 
-# Returns the inner _Buffer object
-def buffer():
-  return this.__buffer
+# Returns the text that draws 'text' as big digits (see Display.big_digits())
+def big_digits(text):
+  return this.__default.big_digits(text)
 
 
-# Gets a _Line form the inner _Buffer
-# If provided with an 'index' it returns the _Line at that index in the buffer
-# If provided with an 'offset' it returns the _Line that is 'offset' many
-# places away from the current _Line on the LCD screen
-# If nothing is provided it returns the current _Line
-def line(index=None, offset=None):
+# Returns the text that draws a horizontal bar (see Display.hbar())
+def hbar(value, width=None):
+  return this.__default.hbar(value, width)
 
-  if index:
-    return this.__buffer[index]
-  elif offset:
-    return this.__buffer[ this.__buffer._current_line_index + offset ]
-  else:
-    return this.__buffer.line()
 
+# Returns the text that draws vertical bars (see Display.vbars())
+def vbars(values, height=None):
+  return this.__default.vbars(values, height)
 
-from threading import Lock
 
+# Returns a _Canvas to draw on dot by dot (see Display.canvas())
+def canvas(columns=None, lines=None, column=0, line=0):
+  return this.__default.canvas(columns, lines, column, line)
 
-# Create a lock to secure the process of writing text on the screen because
-# different threads created by multiple scrollers can mess it up
-lock = Lock()
 
+# Returns a specific _Scroller instance acording to the type of the parameter
+# given
+def scroll(what=None):
+  return this.__default.scroll(what)
 
-# Writes LCD_LINES many formatted _Lines from the _Buffer (if there are enough)
-# to the LCD screen. This function blocks other threads from accessing it while
-# it executes on some other thread
-def __rewrite():
-  lock.acquire()
-  
-  HD44780.clear()
 
-  for offset in range(LCD_LINES):
-    if line(offset=offset) == None: break
-    HD44780.write(str(line(offset=offset)))
-    HD44780.set_ddram_address(0x40)
-  
-  lock.release()
+# Returns the inner _Buffer object
+def buffer():
+  return this.__default.buffer()
 
+
+# Gets a _Line form the inner _Buffer (see Display.line())
+def line(index=None, offset=None):
+  return this.__default.line(index, offset)
@@ -0,0 +1,284 @@
+# Copyright (c) 2017 Ioannes Bracciano
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+  This python module provides awaitable counterparts of the functions of Dots,
+  for applications that run on an asyncio event loop (Python 3 only). They
+  change the text of the default display of Dots, exactly as the functions of
+  Dots do, so lines and cells are still looked up with Dots.line() and
+  Dots.buffer(), and Dots.init() still initializes the controller. The
+  difference is that they return once the text is written on the LCD screen,
+  without ever blocking the loop:
+    * The text is changed under the lock of the display and its frame is
+      written by the writer thread of Dots, as for every other change, while
+      the loop awaits it (see Dots.flush())
+    * Scrollers run as tasks on the loop instead of on the scheduler thread of
+      Dots, and cancelling their task is the same as calling stop()
+
+  As every change goes through the display, the functions of both modules can
+  be used at the same time, from the loop and from other threads.
+
+
+  Author and Maintainer
+  Ioannes Bracciano <john.bracciano@gmail.com>
+'''
+
+
+import asyncio
+from inspect import isawaitable
+
+import Dots
+
+
+# _Scroller wraps the _Scroller of Dots for the same container, so that
+# scrolling is performed the same way, while every() and bounce() run as tasks
+# on the event loop
+class _Scroller(object):
+
+  # Scrolls the contents of the screen upwards (see Dots)
+  # Returns self for call chaining
+  def up(self, by=1):
+    self._scroller.up(by)
+    return self
+
+
+  # Scrolls the contents of the screen downwards (see Dots)
+  # Returns self for call chaining
+  def down(self, by=1):
+    self._scroller.down(by)
+    return self
+
+
+  # Scrolls the contents of a _Line or a _Cell to the right (see Dots)
+  # Returns self for call chaining
+  def right(self, by=1):
+    self._scroller.right(by)
+    return self
+
+
+  # Scrolls the contents of a _Line or a _Cell to the left (see Dots)
+  # Returns self for call chaining
+  def left(self, by=1):
+    self._scroller.left(by)
+    return self
+
+
+  # Performs the scrolling once and writes the result on the screen
+  async def once(self):
+    self._scroller.once()
+    await self._flush()
+
+
+  # Starts a task on the running loop that performs the scrolling every
+  # 'seconds', until the contents of the container can no longer scroll. Then
+  # 'callback' is called (and awaited, if it returns an awaitable) after one
+  # more interval
+  # Returns the task, which can be awaited or cancelled. Cancelling it is the
+  # same as calling stop()
+  def every(self, seconds, callback=None):
+    return self._start(seconds, callback, bounce=False)
+
+
+  # Starts a task on the running loop that scrolls indefinitely left and right
+  # every 'seconds'
+  # Returns the task, which can be cancelled to stop the scrolling
+  def bounce(self, seconds):
+    return self._start(seconds, None, bounce=True)
+
+
+  # Stops the scrolling of the contents by cancelling its task
+  # Scrolling can start again right away with every() or bounce()
+  def stop(self):
+    if self._task:
+      self._task.cancel()
+      self._task = None
+
+
+  # Stops any scrolling in progress and starts a new task to scroll
+  def _start(self, seconds, callback, bounce):
+    self.stop()
+    self._task = asyncio.ensure_future(self._run(seconds, callback, bounce))
+    return self._task
+
+
+  # Performs the scrolling every 'seconds' of the loop's clock
+  # The first scroll is performed right away and the next ones are due every
+  # 'seconds' after it, so the scrolling does not drift however long each
+  # scroll takes. Scrollers that tick together share the same frame
+  async def _run(self, seconds, callback, bounce):
+    loop = asyncio.get_event_loop()
+    scroller = self._scroller
+    due = loop.time()
+
+    while True:
+      will_scroll_further = scroller._locked_scroll()
+      if scroller._is_displayed():
+        self._request_frame()
+
+      due += seconds
+      if not will_scroll_further:
+        if not bounce: break
+        scroller._scroll_offset = -scroller._scroll_offset
+
+      await asyncio.sleep(due - loop.time())
+
+    await asyncio.sleep(due - loop.time())
+    if callback:
+      result = callback()
+      if isawaitable(result):
+        await result
+
+
+  # Initializes the _Scroller
+  def __init__(self, scroller, flush, request_frame):
+    self._scroller = scroller
+    self._flush = flush
+    self._request_frame = request_frame
+    self._task = None
+
+
+# Class _Scroller END
+################################################################################
+
+
+from sys import modules
+
+# Get a pointer to this module
+this = modules[__name__]
+
+
+# The loop the module is used on. Whatever is kept for it is dropped when the
+# module is used on another loop (a closed loop never requests its last frame)
+this.__loop = None
+
+# The task that requests the next frame requested by the scrollers, if any
+this.__frame = None
+
+# The time of the loop's clock the last frame of the scrollers was requested at
+this.__last_frame = None
+
+
+# Displays the given text on the LCD screen
+# The text is parsed and swapped in exactly as Dots.display() does
+async def display(text, lazy=False):
+  Dots.default_display().display(text, lazy)
+  await __flush()
+
+
+# Appends more lines of text at the end of the text on the LCD screen
+async def append(text):
+  Dots.default_display().append(text)
+  await __flush()
+
+
+# Inserts more lines of text before the line at 'index' in the _Buffer
+async def insert(index, text):
+  Dots.default_display().insert(index, text)
+  await __flush()
+
+
+# Removes 'count' many lines of text from the _Buffer, starting at 'index'
+async def remove(index, count=1):
+  Dots.default_display().remove(index, count)
+  await __flush()
+
+
+# Replaces the text of the _Line at 'index' in the _Buffer (see Dots)
+async def update_line(index, text):
+  Dots.default_display().update_line(index, text)
+  await __flush()
+
+
+# Replaces the text of the given _Cell (see Dots)
+async def update_cell(cell, text):
+  Dots.default_display().update_cell(cell, text)
+  await __flush()
+
+
+# Formats the string currently displayed on the screen
+# Tab stops are given exactly as to Dots.format()
+async def format(tab_stops):
+  Dots.default_display().format(tab_stops)
+  await __flush()
+
+
+# Clears the display of all text
+# The instruction is sent on a thread of the loop's executor, as it waits for
+# the bus
+async def clear():
+  loop = asyncio.get_event_loop()
+  await loop.run_in_executor(None, Dots.default_display().clear)
+
+
+# Registers a custom 5x8 dot pattern under 'name', as Dots.glyph() does
+# Returns the character that stands for the glyph in the text
+async def glyph(name, pattern=None):
+  char = Dots.default_display().glyph(name, pattern)
+  if pattern is not None:
+    await __flush()
+  return char
+
+
+# Returns a specific _Scroller instance acording to the type of the parameter
+# given, as Dots.scroll() does
+def scroll(what=None):
+  return _Scroller(Dots.scroll(what), __flush, __request_frame)
+
+
+# Starts keeping the frames of the running loop, if the module was used on
+# another loop before
+def __use_running_loop():
+  loop = asyncio.get_event_loop()
+  if loop is not this.__loop:
+    this.__loop = loop
+    this.__frame = None
+    this.__last_frame = None
+
+
+# Requests a frame from the default display, by a task on the running loop.
+# Requests made before the frame is requested are merged into it, and frames
+# are requested at most Dots.MAX_FPS times per second
+def __request_frame():
+  __use_running_loop()
+  if this.__frame is None:
+    this.__frame = asyncio.ensure_future(__write_requested_frame())
+
+
+# Requests the frame, as soon as enough time has passed since the last one
+# Requests made from now on are merged into the next frame. The error of a
+# frame that failed is left to the next function that awaits one
+async def __write_requested_frame():
+  loop = asyncio.get_event_loop()
+  if this.__last_frame is not None:
+    await asyncio.sleep(this.__last_frame + 1.0 / Dots.MAX_FPS - loop.time())
+
+  this.__frame = None
+  this.__last_frame = loop.time()
+  Dots.default_display()._background_rewrite()
+
+
+# Lets the loop run other tasks until every frame of the default display
+# requested so far is written, and raises the error of a frame that failed
+# The frames are waited for on a thread of the loop's executor, so a task that
+# is cancelled while waiting leaves the frame to be written to the end
+async def __flush():
+  loop = asyncio.get_event_loop()
+  await loop.run_in_executor(None, Dots.default_display().flush)
@@ -0,0 +1,100 @@
+# Python script to test the functionality of DotsAsync.py (Python 3 only)
+# The tests run against a virtual controller, so they can run off the pi
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import time
+import asyncio
+import unittest
+import Dots
+import DotsAsync
+from ifc.VirtualHD44780 import VirtualHD44780
+
+
+class AsyncTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.lcd = VirtualHD44780()
+    Dots.init(transport=self.lcd)
+    self.loop = asyncio.new_event_loop()
+
+
+  def tearDown(self):
+    self.loop.close()
+
+
+  def test_display(self):
+    async def display():
+      await DotsAsync.display("3\tDoukissis Plakentias\t  4'\n3\tAirport\t 16'")
+      await DotsAsync.format([2,12])
+      await DotsAsync.scroll(Dots.line().cell(1)).left(10).once()
+
+    self.loop.run_until_complete(display())
+    # Assert the formatted and scrolled lines are shown on the screen
+    self.assertEqual(self.lcd.screen(), ["3 Plakentias  4'", "3 Airport    16'"],\
+        "Unexpected contents on screen: {}".format(self.lcd.screen()))
+    # Assert the controller was never sent anything while busy
+    self.assertEqual(self.lcd.violations, 0,\
+        "Instructions sent while controller was busy: {}".format(self.lcd.violations))
+
+
+  def test_not_blocking(self):
+    # Make every chunk sent to the controller take a while, as on a slow bus
+    send = self.lcd.send
+    def slow_send(rs, levels):
+      time.sleep(0.0005)
+      send(rs, levels)
+    self.lcd.send = slow_send
+    ticks = []
+
+    async def count_ticks():
+      while True:
+        ticks.append(len(ticks))
+        await asyncio.sleep(0)
+
+    async def display():
+      counter = asyncio.ensure_future(count_ticks())
+      await DotsAsync.display("abcdefghijklmnop\nqrstuvwxyzABCDEF")
+      counter.cancel()
+
+    self.loop.run_until_complete(display())
+    # Assert other tasks ran between the instructions
+    self.assertTrue(len(ticks) > 32,\
+        "Loop was blocked while displaying, other tasks ran {} times".format(len(ticks)))
+    self.assertEqual(self.lcd.screen(), ["abcdefghijklmnop", "qrstuvwxyzABCDEF"],\
+        "Unexpected contents on screen: {}".format(self.lcd.screen()))
+
+
+  def test_every(self):
+    async def scroll():
+      await DotsAsync.display("abcdefghijklmnopqrstuvwxyz")
+      cell = Dots.line().cell()
+      scroller = DotsAsync.scroll(cell).left()
+      # Assert the cell scrolls to its end and the task completes
+      done = []
+      await asyncio.wait_for(scroller.every(0.005, lambda: done.append(True)), 1)
+      self.assertEqual(done, [True], "Callback was not called")
+      self.assertEqual(str(cell), "klmnopqrstuvwxyz",\
+          "Cell did not scroll to its end: {}".format(str(cell)))
+      # Assert cancelling the task stops the scrolling
+      task = scroller.right().every(0.005)
+      await asyncio.sleep(0.02)
+      task.cancel()
+      offset = cell._scroll_offset
+      await asyncio.sleep(0.02)
+      self.assertEqual(cell._scroll_offset, offset,\
+          "Cell scrolled after its task was cancelled: {}".format(cell._scroll_offset))
+      # Let the last frame be requested
+      await asyncio.sleep(1.0 / Dots.MAX_FPS)
+      return cell
+
+    cell = self.loop.run_until_complete(scroll())
+    Dots.flush()
+    self.assertEqual(self.lcd.screen()[0], str(cell),\
+        "Screen does not show the scrolled cell: {}".format(self.lcd.screen()))
+
+
+if __name__ == "__main__":
+  unittest.main(verbosity=2)
@@ -0,0 +1,438 @@
+# Python script to benchmark the performance of Dots.py
+# The benchmarks run against a virtual controller, so they can run on any
+# computer and be compared between versions. For each of them it reports:
+#   * the wall time each operation takes on this computer
+#   * the instructions each operation sends to the controller
+#   * the time the controller would need for them, with the default delays
+#   * for scrolling every number of seconds, the jitter between ticks
+#   * for parsing, the memory each line takes (on Python 3)
+#
+# Usage: python Dots_Bench.py [repeat]
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import os
+import sys
+import tempfile
+from timeit import default_timer as timer
+from threading import Event
+
+import Dots
+from ifc.VirtualHD44780 import VirtualHD44780
+
+
+# Number of lines of the large buffers
+LARGE_BUFFER_LINES = 10000
+
+
+# Holds the measurements of one benchmark
+class Result:
+
+  def __init__(self, name, count, wall, instructions, bus, jitter=None,
+               memory=None):
+    self.name = name
+    self.count = count
+    self.wall = wall
+    self.instructions = instructions
+    self.bus = bus
+    self.jitter = jitter
+    self.memory = memory
+
+
+  # Formats the measurements in one line of the report
+  def __str__(self):
+    line = "{:<28} {:>10.1f} {:>10.1f} {:>10.1f}".format(self.name,
+        self.wall / self.count * 1e6,
+        float(self.instructions) / self.count,
+        self.bus / self.count * 1e6)
+
+    if self.jitter:
+      line += " {:>10.1f} {:>10.1f}".format(self.jitter[0] * 1e6,
+                                            self.jitter[1] * 1e6)
+    elif self.memory is not None:
+      line += " {:>10} {:>10}".format("", "")
+
+    if self.memory is not None:
+      line += " {:>10.1f}".format(float(self.memory) / self.count)
+    return line
+
+
+# Initializes Dots with a fresh virtual controller and returns the latter
+def _virtual_lcd():
+  lcd = VirtualHD44780()
+  Dots.init(transport=lcd)
+  return lcd
+
+
+# Runs 'operation' 'count' times and measures it
+# Frames are written in the background, so each operation is measured until
+# its frame is written
+def _measure(name, lcd, operation, count):
+  Dots.flush()
+  instructions, bus = lcd.instructions, lcd.clock()
+  start = timer()
+
+  for i in range(count):
+    operation(i)
+    Dots.flush()
+
+  return Result(name, count, timer() - start,
+                lcd.instructions - instructions, lcd.clock() - bus)
+
+
+# Returns 'lines' many lines of tabbed text
+def _large_text(lines):
+  return '\n'.join("{}\tStation number {}\t{}'".format(i % 10, i, i % 60)
+                   for i in range(lines))
+
+
+# Repaints the whole screen with different text every time
+def bench_repaint(repeat):
+  lcd = _virtual_lcd()
+  texts = ["abcdefghijklmnop\nqrstuvwxyzABCDEF", "0123456789!@#$%^\n&*()_+-=[]{};:,."]
+  return _measure("full-screen repaint", lcd,
+                  lambda i: Dots.display(texts[i % 2]), repeat)
+
+
+# Displays different text over and over without waiting for the frames, as a
+# burst of updates would, and measures how long each call keeps the caller
+def bench_display_burst(repeat):
+  lcd = _virtual_lcd()
+  instructions, bus = lcd.instructions, lcd.clock()
+  start = timer()
+
+  for i in range(repeat):
+    Dots.display("Frame {}\n{}".format(i, i * i))
+
+  wall = timer() - start
+  Dots.flush()
+  return Result("display() burst", repeat, wall,
+                lcd.instructions - instructions, lcd.clock() - bus)
+
+
+# Repaints the whole screen with Greek text, translated into the characters
+# of the ROM and into glyphs
+def bench_greek_repaint(repeat):
+  lcd = _virtual_lcd()
+  texts = [ u"\u0394\u03bf\u03c5\u03ba\u03af\u03c3\u03c3\u03b7\u03c2\n"
+            u"\u03a0\u03bb\u03b1\u03ba\u03b5\u03bd\u03c4\u03af\u03b1\u03c2",
+            u"\u0391\u03b5\u03c1\u03bf\u03b4\u03c1\u03cc\u03bc\u03b9\u03bf\n"
+            u"\u03a3\u03cd\u03bd\u03c4\u03b1\u03b3\u03bc\u03b1" ]
+  return _measure("Greek repaint", lcd,
+                  lambda i: Dots.display(texts[i % 2]), repeat)
+
+
+# Repaints two displays on the same bus with different text every time, by
+# calling 'write' with the two displays and their texts, and measures each
+# pair of frames
+def _bench_two_displays(name, repeat, write):
+  top_lcd = VirtualHD44780()
+  bottom_lcd = VirtualHD44780(bus=top_lcd)
+  top, bottom = Dots.Display(), Dots.Display()
+  top.init(transport=top_lcd)
+  bottom.init(transport=bottom_lcd)
+  texts = ["abcdefghijklmnop\nqrstuvwxyzABCDEF", "0123456789!@#$%^\n&*()_+-=[]{};:,."]
+
+  instructions = top_lcd.instructions + bottom_lcd.instructions
+  bus = top_lcd.clock()
+  start = timer()
+  for i in range(repeat):
+    write(top, bottom, texts[i % 2], texts[(i + 1) % 2])
+    top.flush()
+    bottom.flush()
+
+  return Result(name, repeat, timer() - start,
+                top_lcd.instructions + bottom_lcd.instructions - instructions,
+                top_lcd.clock() - bus)
+
+
+# Repaints two displays on the same bus, one after the other
+def bench_two_displays(repeat):
+  def write(top, bottom, top_text, bottom_text):
+    top.display(top_text)
+    top.flush()
+    bottom.display(bottom_text)
+  return _bench_two_displays("2 displays repaint", repeat, write)
+
+
+# Repaints two displays on the same bus, interleaving their instructions
+def bench_two_displays_interleaved(repeat):
+  def write(top, bottom, top_text, bottom_text):
+    with Dots.interleaved():
+      top.display(top_text)
+      bottom.display(bottom_text)
+  return _bench_two_displays("2 displays interleaved", repeat, write)
+
+
+# Writes a frame while nothing on the screen has changed
+def bench_idle_frame(repeat):
+  lcd = _virtual_lcd()
+  Dots.display("3\tDoukissis Plakentias\t  4'\n3\tAirport\t 16'")
+  Dots.format([2,12])
+  return _measure("idle frame", lcd,
+                  lambda i: Dots.default_display()._rewrite(), repeat)
+
+
+# Scrolls the text of a cell by one character
+def bench_marquee(repeat):
+  lcd = _virtual_lcd()
+  Dots.display("3\tDoukissis Plakentias\t  4'\n3\tAirport\t 16'")
+  Dots.format([2,12])
+  cell = Dots.line().cell(1)
+
+  # Scroll back and forth, so that every tick moves the text
+  def tick(i):
+    scroller = Dots.scroll(cell)
+    scroller.right().once() if i % 2 else scroller.left().once()
+
+  return _measure("single-cell marquee tick", lcd, tick, repeat)
+
+
+# Scrolls a line that fits in DDRAM by one cell
+def bench_line_scroll(repeat):
+  lcd = _virtual_lcd()
+  Dots.display("Cells\tthat\tcarry\ton\tbeyond\tline")
+  Dots.format([6,11,16,19,28])
+
+  def tick(i):
+    scroller = Dots.scroll(Dots.line())
+    scroller.right().once() if i % 2 else scroller.left().once()
+
+  return _measure("line scroll tick", lcd, tick, repeat)
+
+
+# Displays a large buffer
+def bench_display_large(repeat):
+  lcd = _virtual_lcd()
+  text = _large_text(LARGE_BUFFER_LINES)
+  return _measure("display 10k lines", lcd,
+                  lambda i: Dots.display(text), max(repeat // 100, 1))
+
+
+# Displays a large buffer lazily
+def bench_display_lazy(repeat):
+  lcd = _virtual_lcd()
+  text = _large_text(LARGE_BUFFER_LINES)
+  return _measure("display 10k lines lazily", lcd,
+                  lambda i: Dots.display(text, lazy=True), max(repeat // 100, 1))
+
+
+# Displays a large file, mapped in memory
+def bench_display_file(repeat):
+  lcd = _virtual_lcd()
+  descriptor, path = tempfile.mkstemp()
+  with os.fdopen(descriptor, 'w') as large:
+    large.write(_large_text(LARGE_BUFFER_LINES))
+
+  try:
+    return _measure("display_file() of 10k lines", lcd,
+                    lambda i: Dots.display_file(path), max(repeat // 100, 1))
+  finally:
+    # Displaying other text closes the file
+    Dots.display("")
+    os.remove(path)
+
+
+# Scrolls the screen down one line through a large buffer
+def bench_screen_scroll(repeat):
+  lcd = _virtual_lcd()
+  Dots.display(_large_text(LARGE_BUFFER_LINES))
+  return _measure("screen scroll on 10k lines", lcd,
+                  lambda i: Dots.scroll().down().once(), repeat)
+
+
+# Scrolls the text of a cell on the last lines of a large buffer, checking
+# whether the cell is displayed on every tick
+def bench_marquee_large(repeat):
+  lcd = _virtual_lcd()
+  Dots.display(_large_text(LARGE_BUFFER_LINES))
+  Dots.scroll().down(LARGE_BUFFER_LINES).once()
+  cell = Dots.line().cell(1)
+
+  def tick(i):
+    scroller = Dots.scroll(cell)
+    scroller.right().once() if i % 2 else scroller.left().once()
+
+  return _measure("marquee tick on 10k lines", lcd, tick, repeat)
+
+
+# Appends one line at a time to a large buffer
+def bench_append_large(repeat):
+  lcd = _virtual_lcd()
+  Dots.display(_large_text(LARGE_BUFFER_LINES))
+  return _measure("append() to 10k lines", lcd,
+                  lambda i: Dots.append("Appended line {}".format(i)), repeat)
+
+
+# Updates the text of a cell, as a dashboard would
+def bench_update_cell(repeat):
+  lcd = _virtual_lcd()
+  Dots.display("Temperature\t21C\nHumidity\t40%")
+  Dots.format([12])
+  cell = Dots.line().cell(1)
+  return _measure("update_cell() tick", lcd,
+                  lambda i: Dots.update_cell(cell, "{}C".format(i % 40)), repeat)
+
+
+# Updates a number next to 8 custom glyphs, swapping one glyph for another
+# that was shown before on every other tick
+def bench_glyphs(repeat):
+  lcd = _virtual_lcd()
+  icons = [ Dots.glyph("icon{}".format(i), [i] * 8) for i in range(9) ]
+  Dots.display(''.join(icons[:8]) + "\t0")
+  Dots.format([8])
+
+  def tick(i):
+    Dots.update_line(0, ''.join(icons[i % 2 : 8 + i % 2]) + "\t{}".format(i))
+
+  return _measure("glyph swap tick", lcd, tick, repeat)
+
+
+# Updates a level meter that rises and falls by a column of dots at a time
+def bench_meter(repeat):
+  lcd = _virtual_lcd()
+  Dots.display("Level\t" + Dots.hbar(0, 10))
+  Dots.format([6])
+  cell = Dots.line().cell(1)
+
+  def tick(i):
+    level = i % 100 if (i // 100) % 2 == 0 else 100 - i % 100
+    Dots.update_cell(cell, Dots.hbar(level / 100.0, 10))
+
+  return _measure("level meter tick", lcd, tick, repeat)
+
+
+# Moves a dot across a canvas of the whole screen. Needs NumPy
+def bench_canvas(repeat):
+  try:
+    canvas = Dots.canvas()
+  except ImportError:
+    return Result("canvas dot tick", 1, 0, 0, 0)
+  lcd = _virtual_lcd()
+
+  def tick(i):
+    canvas.clear()
+    canvas.set(i % 80, (i // 80) % 16)
+    canvas.flush()
+
+  return _measure("canvas dot tick", lcd, tick, repeat)
+
+
+# Parses a buffer of 100k tabbed lines and measures the memory it takes per
+# line. Memory is traced with tracemalloc, so it is not measured on Python 2
+def bench_memory(repeat, lines=100000):
+  try:
+    import tracemalloc
+  except ImportError:
+    return Result("parse() 100k lines (memory)", 1, 0, 0, 0)
+
+  text = _large_text(lines)
+  tracemalloc.start()
+  start = timer()
+  buffer = Dots._Buffer().parse(text)
+  wall = timer() - start
+  memory = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  return Result("parse() 100k lines (memory)", lines, wall, 0, 0,
+                memory=memory)
+
+
+# Formats a large buffer with the same tab stops for every line
+def bench_format_large(repeat):
+  lcd = _virtual_lcd()
+  Dots.display(_large_text(LARGE_BUFFER_LINES))
+  return _measure("format() on 10k lines", lcd,
+                  lambda i: Dots.format([2,12]), max(repeat // 100, 1))
+
+
+# Scrolls a cell every 'interval' seconds and measures how far apart the ticks
+# actually are from each other
+def bench_every(repeat, interval=0.01):
+  lcd = _virtual_lcd()
+  max_fps = Dots.MAX_FPS
+  Dots.display(''.join(chr(ord('a') + i % 26) for i in range(16 + repeat)))
+  cell = Dots.line().cell()
+  ticks = []
+  done = Event()
+
+  # Let every tick write its own frame
+  Dots.set_max_fps(1.0 / interval)
+  scroller = Dots.scroll(cell).left()
+  rewrite = scroller._background_rewrite
+
+  def tick():
+    ticks.append(timer())
+    rewrite()
+
+  scroller._background_rewrite = tick
+  instructions, bus = lcd.instructions, lcd.clock()
+  start = timer()
+  scroller.every(interval, done.set)
+  done.wait(interval * repeat * 10)
+  Dots.set_max_fps(max_fps)
+
+  deviations = [ abs(b - a - interval) for a, b in zip(ticks, ticks[1:]) ]
+  mean = sum(deviations) / max(len(deviations), 1)
+  return Result("every({}) tick".format(interval), max(len(ticks), 1),
+                timer() - start, lcd.instructions - instructions,
+                lcd.clock() - bus, (mean, max(deviations or [0])))
+
+
+# Scrolls three cells together every 'interval' seconds, faster than the frame
+# rate, and measures the frames written on the screen
+def bench_every_coalesced(repeat, interval=0.01):
+  lcd = _virtual_lcd()
+  text = ''.join(chr(ord('a') + i % 26) for i in range(16 + repeat))
+  Dots.display("{0}\t{0}\n{0}".format(text))
+  Dots.format([8])
+  cells = [ Dots.line().cell(0), Dots.line().cell(1),
+            Dots.line(offset=1).cell(0) ]
+  frames = []
+
+  # Count the frames the writer writes
+  display = Dots.default_display()
+  write_frame = display._write_frame
+  def counting_write_frame():
+    frames.append(timer())
+    write_frame()
+
+  display._write_frame = counting_write_frame
+  instructions, bus = lcd.instructions, lcd.clock()
+  start = timer()
+  scrollers = [ Dots.scroll(cell).left().every(interval) for cell in cells ]
+  Event().wait(interval * repeat)
+  for scroller in scrollers:
+    scroller.stop()
+  # Let the last frame requested be written
+  Event().wait(1.0 / Dots.MAX_FPS)
+  Dots.flush()
+  del display._write_frame
+
+  return Result("3 x every({}) frame".format(interval), max(len(frames), 1),
+                timer() - start, lcd.instructions - instructions,
+                lcd.clock() - bus)
+
+
+BENCHMARKS = [ bench_repaint, bench_display_burst, bench_greek_repaint,
+               bench_two_displays, bench_two_displays_interleaved,
+               bench_idle_frame,
+               bench_marquee, bench_line_scroll, bench_display_large,
+               bench_display_lazy, bench_display_file, bench_screen_scroll,
+               bench_marquee_large, bench_append_large, bench_update_cell,
+               bench_glyphs, bench_meter, bench_canvas, bench_memory,
+               bench_format_large,
+               bench_every,
+               bench_every_coalesced ]
+
+
+if __name__ == "__main__":
+  repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+  print("{:<28} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+      "benchmark", "wall us", "instr", "bus us", "jitter us", "max jit us",
+      "bytes"))
+  for benchmark in BENCHMARKS:
+    print(str(benchmark(repeat)))
@@ -1,15 +1,33 @@
 # Python script to test the functionality of Dots.py
+# Pass --virtual to run the tests against a virtual controller, off the pi
 #
 # Author and Maintainer
 # Ioannes Bracciano <john.bracciano@gmail.com>
 
 
+import os
+import sys
+import time
+import tempfile
+import threading
 import unittest
 import Dots
+from ifc.VirtualHD44780 import VirtualHD44780
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 
 class SimpleTestCase(unittest.TestCase):
 
+  # The display is initialized by this script, but not by other runners
+  def setUp(self):
+    if Dots.default_display()._controller is None:
+      Dots.init(transport=VirtualHD44780())
+
+
   def test_parsing(self):
     # Parse an empty string
     Dots.buffer().parse("")
@@ -36,13 +54,79 @@ class SimpleTestCase(unittest.TestCase):
         "Expected 3 lines in buffer, found {}".format(Dots.buffer().line_count()))
   
 
+  def test_appending(self):
+    Dots.buffer().parse("One\nTwo\nThree\nFour\nFive")
+    Dots.scroll().down(2).once()
+    current = Dots.line()
+    # Assert appending keeps the lines and the scrolling of the buffer
+    Dots.buffer().append("Six\nSeven")
+    self.assertEqual(Dots.buffer().line_count(), 7,\
+        "Expected 7 lines in buffer, found {}".format(Dots.buffer().line_count()))
+    self.assertTrue(Dots.line() is current,\
+        "Current line changed after appending: {}".format(str(Dots.line())))
+    self.assertEqual(str(Dots.line(6)).strip(), "Seven",\
+        "Unexpected last line: {}".format(str(Dots.line(6))))
+    # Assert inserting before the current line keeps it current
+    Dots.buffer().insert(0, "Zero")
+    self.assertTrue(Dots.line() is current,\
+        "Current line changed after inserting: {}".format(str(Dots.line())))
+    self.assertEqual(str(Dots.buffer()[0]).strip(), "Zero",\
+        "Unexpected first line: {}".format(str(Dots.buffer()[0])))
+    # Assert removing before the current line keeps it current
+    Dots.buffer().remove(0, 2)
+    self.assertTrue(Dots.line() is current,\
+        "Current line changed after removing: {}".format(str(Dots.line())))
+    # Assert removing the current line makes the next one current
+    Dots.buffer().remove(1)
+    self.assertEqual(str(Dots.line()).strip(), "Four",\
+        "Unexpected current line after removing it: {}".format(str(Dots.line())))
+    # Assert removing every line empties the buffer
+    Dots.buffer().remove(0, 10)
+    self.assertEqual(Dots.buffer().line_count(), 0,\
+        "Expected 0 lines in buffer, found {}".format(Dots.buffer().line_count()))
+
+
+  def test_lazy_parsing(self):
+    self.addCleanup(setattr, Dots, 'MAX_RESIDENT_LINES', Dots.MAX_RESIDENT_LINES)
+    Dots.MAX_RESIDENT_LINES = 10
+    Dots.buffer().parse('\n'.join("Line\t{}".format(i) for i in range(1000)), lazy=True)
+    # Assert lines are counted but not parsed
+    self.assertEqual(Dots.buffer().line_count(), 1000,\
+        "Expected 1000 lines in buffer, found {}".format(Dots.buffer().line_count()))
+    self.assertEqual(len(Dots.buffer()._lines.resident()), 0,\
+        "Lines were parsed before being accessed")
+    # Assert lines are parsed when scrolled to
+    Dots.scroll().down(500).once()
+    self.assertEqual(str(Dots.line()), "Line    500     ",\
+        "Unexpected current line: {}".format(str(Dots.line())))
+    # Assert parsed lines are kept up to the bound
+    for line in Dots.buffer():
+      pass
+    self.assertEqual(len(Dots.buffer()._lines.resident()), 10,\
+        "Unexpected number of parsed lines: {}".format(len(Dots.buffer()._lines.resident())))
+    # Assert lines parsed after formatting are formatted as well
+    Dots.buffer().format_lines(lambda index, line: line.set_tab_stops([4]))
+    self.assertEqual(str(Dots.buffer()[700]), "Line700         ",\
+        "Line parsed after formatting is not formatted: {}".format(str(Dots.buffer()[700])))
+    # Assert inserting and removing lines keeps the current line
+    current = Dots.line()
+    Dots.buffer().insert(0, "Zero\nOne")
+    Dots.buffer().remove(100, 5)
+    self.assertTrue(Dots.line() is current,\
+        "Current line changed: {}".format(str(Dots.line())))
+    self.assertEqual(Dots.buffer().line_count(), 997,\
+        "Expected 997 lines in buffer, found {}".format(Dots.buffer().line_count()))
+    self.assertEqual(str(Dots.buffer()[1]), "One ",\
+        "Unexpected second line: {}".format(str(Dots.buffer()[1])))
+
+
   def test_formatting(self):
     Dots.buffer().parse("0\t1\t2\t3\t4\t5\t6\t7\t8\t9\t10\t11\t12\t13\t14\t15")
     # Assert number of cells in line
     self.assertEqual(Dots.line().cell_count(), 16,\
         "Expected 16 cells in line, found: {}".format(Dots.line().cell_count()))
     # Assert auto tab stops were calculated correctly
-    self.assertListEqual(Dots.line()._tab_stops, range(1,16),\
+    self.assertListEqual(Dots.line()._tab_stops, list(range(1,16)),\
         "Unexpected automatically set tab stops: {}".format(Dots.line()._tab_stops))
     # Assert line formats the contents correctly
     self.assertEqual(str(Dots.line()), "0123456789111111",\
@@ -51,11 +135,11 @@ class SimpleTestCase(unittest.TestCase):
     # Assert malformed tab stop arrays raise the correct exception
     with self.assertRaises(ValueError) as cm:
       Dots.line().set_tab_stops(range(15,0,-1))
-    self.assertTrue("ascending" in cm.exception.message.lower())
+    self.assertTrue("ascending" in str(cm.exception).lower())
 
     with self.assertRaises(ValueError) as cm:
       Dots.line().set_tab_stops([])
-    self.assertTrue("fewer" in cm.exception.message.lower())
+    self.assertTrue("fewer" in str(cm.exception).lower())
 
     # Assert setting new tab stop positions affects the formatted contents of
     # the line
@@ -74,6 +158,9 @@ class SimpleTestCase(unittest.TestCase):
     Dots.scroll().down().once()
     self.assertEqual(Dots.line(), Dots.line(1),\
         "Unexpected current line, should be '{}', found '{}'".format(str(Dots.line(1)), str(Dots.line())))
+    # Assert the first line is still looked up by its index
+    self.assertEqual(str(Dots.line(0)).strip(), "One",\
+        "Unexpected first line: '{}'".format(str(Dots.line(0))))
     # Assert scrolling past the last line actually scrolls to it
     Dots.scroll().down( by=4 ).once()
     self.assertEqual(Dots.line(), Dots.line(4),\
@@ -129,9 +216,623 @@ class SimpleTestCase(unittest.TestCase):
         "Tried scrolling before the first character in cell: {}".format(str(Dots.line().cell())))
 
 
+  def test_visibility(self):
+    Dots.buffer().parse("0\t1\t2\t3\t4\t5\t6\t7\nOne\nTwo\nThree")
+    line = Dots.buffer()[0]
+    line.set_tab_stops(range(4,32,4))
+    str(line)
+    # Assert only the lines and cells on the screen are displayed
+    self.assertTrue(line.is_displayed() and Dots.buffer()[1].is_displayed(),\
+        "Lines on the screen are not displayed")
+    self.assertFalse(Dots.buffer()[2].is_displayed(),\
+        "Line below the screen is displayed")
+    self.assertTrue(line.cell(3).is_displayed(),\
+        "Last cell on the screen is not displayed")
+    self.assertFalse(line.cell(4).is_displayed(),\
+        "Cell past the end of the screen is displayed")
+    # Assert cells of a line scrolled off the screen are not displayed
+    Dots.scroll().down().once()
+    self.assertFalse(line.cell(0).is_displayed(),\
+        "Cell of a line off the screen is displayed")
+
+
+  def test_caching(self):
+    Dots.buffer().parse("3\tDoukissis Plakentias\t  4'")
+    line = Dots.line()
+    formatted = line._format_contents()
+    # Assert the formatted contents are kept while nothing changes
+    self.assertTrue(line._format_contents() is formatted,\
+        "Contents of an unchanged line were formatted again")
+    # Assert every change formats the contents again
+    line.set_tab_stops([2,12])
+    self.assertEqual(str(line), "3 Doukissis   4'",\
+        "Line not formatted again after setting tab stops: {}".format(str(line)))
+    Dots.scroll(line.cell(1)).left(10).once()
+    self.assertEqual(str(line), "3 Plakentias  4'",\
+        "Line not formatted again after scrolling a cell: {}".format(str(line)))
+    line.cell(2).text = " 16'"
+    self.assertEqual(str(line), "3 Plakentias 16'",\
+        "Line not formatted again after changing text: {}".format(str(line)))
+    Dots.scroll(line).left().once()
+    self.assertEqual(str(line), "Plakentias 16'",\
+        "Line not formatted again after scrolling: {}".format(str(line)))
+
+
+  def test_updating(self):
+    Dots.buffer().parse("3\tDoukissis Plakentias\t  4'\n3\tAirport\t 16'")
+    Dots.format([2,12])
+    line = Dots.buffer()[0]
+    Dots.scroll(line.cell(1)).left(10).once()
+    # Assert updating a line keeps its cells, tab stops and scrolling
+    cells = list(line)
+    Dots.buffer().update(0, "3\tDoukissis Plakentias\t  3'")
+    self.assertEqual(list(line), cells, "Cells of updated line were parsed again")
+    self.assertEqual(str(line), "3 Plakentias  3'",\
+        "Unexpected updated line: {}".format(str(line)))
+    # Assert a shorter text scrolls back only as much as needed
+    line.cell(1).set_text("Doukissis Pl")
+    self.assertEqual(str(line), "3 ukissis Pl  3'",\
+        "Unexpected updated cell: {}".format(str(line)))
+    # Assert a line with fewer cells is parsed again, keeping its tab stops
+    Dots.buffer().update(1, "3\tAirport")
+    self.assertEqual(Dots.buffer()[1].cell_count(), 2,\
+        "Expected 2 cells in updated line, found {}".format(Dots.buffer()[1].cell_count()))
+    self.assertEqual(str(Dots.buffer()[1]), "3 Airport   ",\
+        "Unexpected updated line: {}".format(str(Dots.buffer()[1])))
+    with self.assertRaises(ValueError):
+      Dots.buffer().update(1, "Two\nlines")
+
+    # Assert lines of a lazy buffer are updated whether parsed or not
+    Dots.buffer().parse("One\nTwo\nThree", lazy=True)
+    line = Dots.buffer()[0]
+    Dots.buffer().update(0, "First").update(2, "Third")
+    self.assertTrue(Dots.buffer()[0] is line, "Parsed line was parsed again")
+    self.assertEqual([str(l).strip() for l in Dots.buffer()],\
+        ["First", "Two", "Third"], "Unexpected updated lazy lines")
+    # Assert the text of replaced lines is not kept
+    for i in range(1000):
+      Dots.buffer().update(1, "Second {}".format(i))
+    chunks = [ chunk for chunk in Dots.buffer()._lines._chunks if chunk ]
+    self.assertEqual(len(chunks), 3,\
+        "Unexpected number of chunks kept: {}".format(len(chunks)))
+    self.assertEqual(str(Dots.buffer()[1]).strip(), "Second 999",\
+        "Unexpected updated lazy line: {}".format(str(Dots.buffer()[1])))
+
+
+  def test_widgets(self):
+    # Assert bars are drawn with full tiles and one partly filled tile
+    bar = Dots.hbar(0.5, 5)
+    full = Dots.glyph(tuple([0x1f] * 8))
+    self.assertEqual(bar[:2], full * 2, "Unexpected full tiles: {}".format(repr(bar)))
+    self.assertEqual(bar[3:], "  ", "Unexpected blank tiles: {}".format(repr(bar)))
+    self.assertEqual(bar[2], Dots.glyph(tuple([0x1c] * 8)),\
+        "Unexpected partly filled tile: {}".format(repr(bar)))
+    bars = Dots.vbars([0.25, 1.0]).split('\n')
+    self.assertEqual(bars, [' ' + full, Dots.glyph(tuple([0x00] * 4 + [0x1f] * 4)) + full],\
+        "Unexpected vertical bars: {}".format(repr(bars)))
+    # Assert big digits share the same tiles, including those of the bars
+    digits = Dots.big_digits("8-8").split('\n')
+    self.assertEqual(len(set(''.join(digits)) - set(' ')), 3,\
+        "Unexpected tiles in big digits: {}".format(repr(digits)))
+    self.assertEqual(digits[0][0] + digits[0][2], full * 2,\
+        "Unexpected big digit: {}".format(repr(digits)))
+    with self.assertRaises(ValueError):
+      Dots.big_digits("8a")
+
+
+  def test_scheduling(self):
+    Dots.buffer().parse("abcdefghijklmnopqrstuvwxyz")
+    cell = Dots.line().cell()
+    # Scroll cell every 10ms and stop it
+    scroller = Dots.scroll(cell).left().every(0.01)
+    time.sleep(0.035)
+    scroller.stop()
+    offset = cell._scroll_offset
+    self.assertTrue(offset > 1,\
+        "Cell did not scroll every 10ms, scrolled {} times".format(offset))
+    # Assert stopping takes effect immediately
+    time.sleep(0.03)
+    self.assertEqual(cell._scroll_offset, offset,\
+        "Cell scrolled after being stopped: {}".format(cell._scroll_offset))
+    # Assert scrolling restarts immediately
+    scroller.every(0.01)
+    scroller.stop()
+    self.assertEqual(cell._scroll_offset, offset + 1,\
+        "Cell did not scroll when restarted: {}".format(cell._scroll_offset))
+
+
+  def test_throttling(self):
+    scheduler = Dots._Scheduler()
+    calls = []
+    job = lambda: calls.append(scheduler.clock())
+    # Assert requests made together are merged into one call
+    for i in range(3): scheduler.throttle(job, 0.05)
+    time.sleep(0.02)
+    self.assertEqual(len(calls), 1,\
+        "Requests were not merged into one call: {}".format(len(calls)))
+    # Assert the next call waits for the interval to pass
+    for i in range(3): scheduler.throttle(job, 0.05)
+    time.sleep(0.01)
+    self.assertEqual(len(calls), 1,\
+        "Job was called before the interval passed: {}".format(len(calls)))
+    time.sleep(0.06)
+    self.assertEqual(len(calls), 2,\
+        "Requests were not merged into one call: {}".format(len(calls)))
+    self.assertTrue(calls[1] - calls[0] >= 0.05,\
+        "Job was called {}s after the last call".format(calls[1] - calls[0]))
+
+
+  def test_throttled_scrolling(self):
+    display = Dots.Display()
+    display.init(transport=VirtualHD44780())
+    display.display("\t".join([ "abcdefghijklmnopqrstuvwxyz" * 4 ] * 3))
+    display.format([5, 10])
+    display.flush()
+    # Count the frames requested from now on, by every scroller of the display
+    rewrites = []
+    rewrite = display._rewrite
+    def counted_rewrite(report=True):
+      rewrites.append(True)
+      rewrite(report)
+    display._rewrite = counted_rewrite
+    # Scroll the three cells of the line at 100 ticks per second each
+    scrollers = [ display.scroll(display.line().cell(i)).left().every(0.01) \
+                                                          for i in range(3) ]
+    start = time.time()
+    time.sleep(0.3)
+    for scroller in scrollers: scroller.stop()
+    elapsed = time.time() - start
+    display.flush()
+    # Assert the cells scrolled, and the frames of their ticks were merged into
+    # at most MAX_FPS frames per second
+    self.assertTrue(display.line().cell(0)._scroll_offset > 10,\
+        "Cell did not scroll every 10ms: {}".format(
+                                        display.line().cell(0)._scroll_offset))
+    self.assertTrue(0 < len(rewrites) <= Dots.MAX_FPS * elapsed + 2,\
+        "Unexpected frames requested in {}s: {}".format(elapsed, len(rewrites)))
+
+
+# Checks what ends up on the screen of a virtual controller
+class RenderingTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.lcd = VirtualHD44780()
+    Dots.init(transport=self.lcd)
+
+
+  # Frames are written in the background, so the virtual controller is read
+  # once the frames requested so far are written
+  def screen(self):
+    Dots.flush()
+    return self.lcd.screen()
+
+
+  def instructions(self):
+    Dots.flush()
+    return self.lcd.instructions
+
+
+  def glyph(self, code):
+    Dots.flush()
+    return self.lcd.glyph(code)
+
+
+  def test_rendering(self):
+    Dots.display("3\tDoukissis Plakentias\t  4'\n3\tAirport\t 16'")
+    Dots.format([2,12])
+    # Assert the formatted lines are shown on the screen
+    self.assertEqual(self.screen(), ["3 Doukissis   4'", "3 Airport    16'"],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    # Assert scrolling a cell only sends the characters that changed
+    instructions = self.instructions()
+    Dots.scroll(Dots.line().cell(1)).left(10).once()
+    self.assertEqual(self.screen(), ["3 Plakentias  4'", "3 Airport    16'"],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(self.instructions() - instructions, 1 + 10,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    # Assert the controller was never sent anything while busy
+    self.assertEqual(self.lcd.violations, 0,\
+        "Instructions sent while controller was busy: {}".format(self.lcd.violations))
+
+
+  def test_updating(self):
+    Dots.display("Temperature\t21C\nHumidity\t40%")
+    Dots.format([12])
+    # Assert updating a cell only sends the characters that changed
+    instructions = self.instructions()
+    Dots.update_cell(Dots.line().cell(1), "22C")
+    self.assertEqual(self.screen(), ["Temperature 22C ", "Humidity    40% "],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(self.instructions() - instructions, 1 + 1,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    # Assert updating a line keeps its tab stops
+    Dots.update_line(1, "Humidity\t45%")
+    self.assertEqual(self.screen(), ["Temperature 22C ", "Humidity    45% "],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+
+
+  def test_glyphs(self):
+    patterns = [ [row] * 8 for row in range(9) ]
+    chars = [ Dots.glyph("icon{}".format(i), patterns[i]) for i in range(9) ]
+    # Assert the glyphs on the screen are loaded in slots
+    Dots.display(''.join(chars[:8]))
+    self.assertEqual(self.screen()[0][:8], ''.join(map(chr, range(8))),\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual([ self.glyph(code) for code in range(8) ], patterns[:8],\
+        "Unexpected dot patterns in CGRAM")
+    # Assert glyphs already loaded are not loaded again
+    instructions = self.instructions()
+    Dots.display(''.join(chars[1:8]))
+    self.assertEqual(self.instructions() - instructions, 1 + 8,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    # Assert a new glyph takes the slot of the glyph no longer on the screen
+    instructions = self.instructions()
+    Dots.display(''.join(chars[1:9]))
+    self.assertEqual(self.glyph(0), patterns[8],\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(0)))
+    self.assertEqual(self.screen()[0][7], chr(0),\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(self.instructions() - instructions, (1 + 8) + (1 + 1),\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    # Assert a glyph that finds no slot is left blank, until it finds one
+    Dots.display(''.join(chars[1:9]) + "\n" + chars[0])
+    self.assertEqual(self.screen()[1][0], ' ',\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    Dots.display(chars[0] + "\n" + chars[0])
+    self.assertEqual(self.screen()[1][0], self.screen()[0][0],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    # Assert changing a pattern on the screen loads it again
+    Dots.glyph("icon0", [0x1f] * 8)
+    code = ord(self.screen()[0][0])
+    self.assertEqual(self.glyph(code), [0x1f] * 8,\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(code)))
+    self.assertEqual(Dots.glyph("icon0"), chars[0], "Glyph changed character")
+    with self.assertRaises(ValueError):
+      Dots.glyph("icon9", [0x20] * 8)
+
+
+  def test_meter(self):
+    Dots.display("Level\t" + Dots.hbar(0.5, 10))
+    Dots.format([6])
+    # Assert a meter rising by a column of dots only rewrites one character
+    instructions = self.instructions()
+    Dots.update_cell(Dots.line().cell(1), Dots.hbar(0.52, 10))
+    self.assertEqual(self.instructions() - instructions, (1 + 8) + (1 + 1),\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    # Assert tiles already loaded are not loaded again
+    Dots.update_cell(Dots.line().cell(1), Dots.hbar(0.5, 10))
+    instructions = self.instructions()
+    Dots.update_cell(Dots.line().cell(1), Dots.hbar(0.52, 10))
+    self.assertEqual(self.instructions() - instructions, 1 + 1,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    self.assertEqual([ self.glyph(ord(char)) for char in self.screen()[0][6:12] ],\
+        [[0x1f] * 8] * 5 + [[0x10] * 8], "Unexpected meter on screen")
+
+
+  @unittest.skipIf(numpy is None, "NumPy is not installed")
+  def test_canvas(self):
+    canvas = Dots.canvas()
+    # Fill the first and the last character, and turn on one more dot
+    canvas.pixels[0:8, 0:5] = True
+    canvas.pixels[8:16, 75:80] = True
+    canvas.set(5, 0)
+    canvas.flush()
+    screen = self.screen()
+    # Assert identical tiles share a glyph and blank tiles are left blank
+    self.assertEqual(screen[0][0], screen[1][15],\
+        "Identical tiles drawn differently: {}".format(screen))
+    self.assertEqual(self.glyph(ord(screen[0][0])), [0x1f] * 8,\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(ord(screen[0][0]))))
+    self.assertEqual(self.glyph(ord(screen[0][1])), [0x10] + [0x00] * 7,\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(ord(screen[0][1]))))
+    self.assertEqual(screen[0][2:] + screen[1][:15], ' ' * 29,\
+        "Unexpected blank tiles: {}".format(screen))
+    # Assert drawing again only writes the tile that changed
+    instructions = self.instructions()
+    canvas.set(5, 0, False)
+    canvas.flush()
+    self.assertEqual(self.instructions() - instructions, 1 + 1,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+
+
+  @unittest.skipIf(numpy is None, "NumPy is not installed")
+  def test_canvas_region(self):
+    Dots.display("Temp\t21C\nHumidity\t40%")
+    Dots.format([10])
+    # Draw a 2x2 canvas at the last two columns of the screen
+    canvas = Dots.canvas(2, 2, column=14)
+    canvas.pixels[:, :] = True
+    canvas.flush()
+    screen = self.screen()
+    # Assert the text outside of the canvas is left as it was
+    self.assertEqual([ line[:14] for line in screen ],\
+        ["Temp      21C ", "Humidity  40% "],\
+        "Text outside of the canvas changed: {}".format(screen))
+    # Assert the canvas is drawn on its own part of the screen
+    self.assertEqual(set(screen[0][14:] + screen[1][14:]), set(screen[0][14]),\
+        "Unexpected canvas on screen: {}".format(screen))
+    self.assertEqual(self.glyph(ord(screen[0][14])), [0x1f] * 8,\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(ord(screen[0][14]))))
+    # Assert a canvas that does not fit on the screen is refused
+    self.assertRaises(ValueError, Dots.canvas, 5, 1, 12)
+
+
+  def test_translation(self):
+    # Assert characters are written with their codes in ROM A00
+    Dots.display(u"\u03b1\u03b2 21\u00b0C \u00a5")
+    self.assertEqual(self.screen()[0][:9], "\xe0\xe2 21\xdfC \x5c",\
+        "Unexpected contents on screen: {}".format(repr(self.screen())))
+    # Assert characters the ROM lacks look like others, or are drawn as glyphs
+    Dots.display(u"\u0394\u03bf\u03c5\u03ba\u03af\u03c3\u03c3\u03b7\u03c2 ~")
+    screen = self.screen()[0]
+    self.assertEqual(screen[1:], "ouki\xe5\xe5Hs " + screen[10] + ' ' * 5,\
+        "Unexpected contents on screen: {}".format(repr(self.screen())))
+    self.assertEqual(self.glyph(ord(screen[0]))[:7],\
+        [0x04, 0x04, 0x0a, 0x0a, 0x11, 0x11, 0x1f],\
+        "Unexpected dot pattern in CGRAM: {}".format(self.glyph(ord(screen[0]))))
+    # Assert glyphs registered under a character draw it
+    Dots.glyph(u"\u03bb", [0x10, 0x08, 0x04, 0x0a, 0x11, 0x11, 0x11, 0x00])
+    Dots.display(u"\u03bb")
+    self.assertEqual(self.glyph(ord(self.screen()[0][0]))[0], 0x10,\
+        "Glyph registered under a character not drawn")
+    # Assert characters are written with their codes in ROM A02
+    Dots.set_rom(Dots.ROM_A02)
+    try:
+      Dots.display(u"\u03a9 \u00e4 \\ \u0411 \u20ac")
+      self.assertEqual(self.screen()[0][:9], "\x9a \xe4 \\ \x80 ?",\
+          "Unexpected contents on screen: {}".format(repr(self.screen())))
+    finally:
+      Dots.set_rom(Dots.ROM_A00)
+    with self.assertRaises(ValueError):
+      Dots.set_rom("A01")
+
+
+  def test_shifting(self):
+    Dots.display("Cells\tthat\tcarry\ton\tbeyond\tline")
+    Dots.format([6,11,16,19,28])
+    # Assert scrolling a line that fits in DDRAM only shifts the display
+    instructions = self.instructions()
+    Dots.scroll(Dots.line()).left().once()
+    self.assertEqual(self.screen(), ["that carryon bey", " " * 16],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(self.instructions() - instructions, 6,\
+        "Unexpected number of instructions: {}".format(self.instructions() - instructions))
+    Dots.scroll(Dots.line()).right().once()
+    self.assertEqual(self.screen(), ["Cells that carry", " " * 16],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    # Assert lines that do not fit in DDRAM are written over
+    Dots.format([10,20,30,40,50])
+    Dots.scroll(Dots.line()).left().once()
+    self.assertEqual(self.screen(), ["that      carry ", " " * 16],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    # Assert a second line scrolled differently is shown without shifting
+    Dots.display("Cells\tthat\tcarry\ton\tbeyond\tline\n3\tAirport\t 16'")
+    Dots.line(0).set_tab_stops([6,11,16,19,28])
+    Dots.line(1).set_tab_stops([2,12])
+    Dots.scroll(Dots.line()).left().once()
+    self.assertEqual(self.screen(), ["that carryon bey", "3 Airport    16'"],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+
+
+  def test_displays(self):
+    # Two more controllers share the bus, each with a display of its own
+    top_lcd = VirtualHD44780()
+    bottom_lcd = VirtualHD44780(columns=20, lines=1, bus=top_lcd)
+    top, bottom = Dots.Display(), Dots.Display(lines=1, columns=20)
+    top.init(transport=top_lcd)
+    bottom.init(transport=bottom_lcd)
+    # Assert each display shows its own text, in its own geometry
+    Dots.display("Default")
+    top.display("Platform 3\tAirport")
+    top.format([11])
+    bottom.display("Next train in\t4 min")
+    bottom.format([15])
+    top.flush()
+    bottom.flush()
+    self.assertEqual(self.screen(), ["Default         ", " " * 16],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(top_lcd.screen(), ["Platform 3 Airpo", " " * 16],\
+        "Unexpected contents on screen: {}".format(top_lcd.screen()))
+    self.assertEqual(bottom_lcd.screen(), ["Next train in  4 min"],\
+        "Unexpected contents on screen: {}".format(bottom_lcd.screen()))
+    # Assert frames written together take less time on the bus than one after
+    # the other, since one controller is fed while the other is busy
+    start = top_lcd.clock()
+    top.display("A" * 16)
+    top.flush()
+    bottom.display("B" * 20)
+    bottom.flush()
+    apart = top_lcd.clock() - start
+    start = top_lcd.clock()
+    with Dots.interleaved():
+      top.display("C" * 16)
+      bottom.display("D" * 20)
+    top.flush()
+    bottom.flush()
+    together = top_lcd.clock() - start
+    self.assertEqual(top_lcd.screen()[0], "C" * 16,\
+        "Unexpected contents on screen: {}".format(top_lcd.screen()))
+    self.assertEqual(bottom_lcd.screen()[0], "D" * 20,\
+        "Unexpected contents on screen: {}".format(bottom_lcd.screen()))
+    self.assertLess(together, apart * 0.7,\
+        "Frames took {}s together and {}s apart".format(together, apart))
+    # Assert no controller was sent anything while busy
+    self.assertEqual(top_lcd.violations + bottom_lcd.violations, 0,\
+        "Instructions sent while controller was busy")
+    with self.assertRaises(ValueError):
+      Dots.Display(lines=4)
+    # Assert a display has no more characters than its lines can have
+    with self.assertRaises(ValueError):
+      Dots.Display(lines=1, columns=60).init(lines=2, transport=VirtualHD44780())
+    # Assert a display that is not initialized writes nothing, to no controller
+    idle = Dots.Display()
+    with self.assertRaises(RuntimeError):
+      idle.display("Idle")
+    with self.assertRaises(RuntimeError):
+      idle.clear()
+    self.assertEqual(top_lcd.screen()[0], "C" * 16,\
+        "Unexpected contents on screen: {}".format(top_lcd.screen()))
+
+
+  def test_background(self):
+    # Hold every chunk sent to the controller until the gate opens
+    gate = threading.Event()
+    send = self.lcd.send
+    def held_send(rs, levels):
+      gate.wait(1)
+      send(rs, levels)
+    self.lcd.send = held_send
+    # Assert displaying returns while the frame is still being written
+    Dots.display("Frame 0")
+    time.sleep(0.01)
+    for i in range(1, 50):
+      Dots.display("Frame {}".format(i))
+    self.assertEqual(self.lcd.screen()[0], " " * 16,\
+        "Frame was written before the bus was free: {}".format(self.lcd.screen()))
+    # Assert the texts displayed meanwhile are merged into one frame of the
+    # newest one
+    instructions = self.lcd.instructions
+    gate.set()
+    self.assertEqual(self.screen()[0], "Frame 49        ",\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertTrue(self.instructions() - instructions <= (1 + 7) + (1 + 2),\
+        "Texts were not merged: {} instructions".format(self.instructions() - instructions))
+
+
+  def test_scroller_frames(self):
+    display = Dots.default_display()
+    Dots.display("abcdefghijklmnopqrstuvwxyz" * 4 + "\n" + \
+                 "ABCDEFGHIJKLMNOPQRSTUVWXYZ" * 4)
+    Dots.flush()
+    # Count the frames written from now on
+    frames = []
+    write_frame = display._write_frame
+    def counted_write_frame():
+      frames.append(True)
+      write_frame()
+    display._write_frame = counted_write_frame
+    self.addCleanup(delattr, display, '_write_frame')
+    # Scroll both lines at 100 ticks per second, a lot faster than MAX_FPS
+    scrollers = [ Dots.scroll(Dots.line(i).cell()).left().every(0.01) \
+                                                          for i in range(2) ]
+    start = time.time()
+    time.sleep(0.3)
+    for scroller in scrollers: scroller.stop()
+    elapsed = time.time() - start
+    Dots.flush()
+    # Assert the ticks of the scrollers were merged into at most MAX_FPS frames
+    # per second
+    self.assertTrue(len(frames) <= Dots.MAX_FPS * elapsed + 2,\
+        "Too many frames written in {}s: {}".format(elapsed, len(frames)))
+    # Assert the throttled job of the display is the same on every tick
+    jobs = [ job for job in Dots.Display._scheduler._last_calls \
+                              if getattr(job, '__self__', None) is display ]
+    self.assertEqual(len(jobs), 1,\
+        "Expected 1 throttled job for the display, found {}".format(len(jobs)))
+
+
+  def test_clear_not_locking(self):
+    Dots.display("Before")
+    Dots.flush()
+    # Hold every chunk sent to the controller until the gate opens
+    gate = threading.Event()
+    send = self.lcd.send
+    def held_send(rs, levels):
+      gate.wait(2)
+      send(rs, levels)
+    self.lcd.send = held_send
+    clearing = threading.Thread(target=Dots.clear)
+    clearing.start()
+    time.sleep(0.05)
+    # Assert the text changes while the clear instruction waits for the bus
+    start = time.time()
+    Dots.display("After")
+    self.assertTrue(time.time() - start < 0.5,\
+        "Displaying waited {}s for the bus".format(time.time() - start))
+    gate.set()
+    clearing.join()
+    # Assert the new text is written after the screen is cleared
+    self.assertEqual(self.screen()[0], "After           ",\
+        "Unexpected contents on screen: {}".format(self.screen()))
+
+
+  def test_failing_frame(self):
+    # Fail the first chunk sent to the controller, and catch anything printed
+    sent = []
+    send = self.lcd.send
+    def failing_send(rs, levels):
+      sent.append(levels)
+      if len(sent) == 1: raise IOError("Bus is gone")
+      send(rs, levels)
+    self.lcd.send = failing_send
+    printed = []
+    stderr = sys.stderr
+    sys.stderr = type("Capture", (object,), { 'write': lambda self, text: \
+                        printed.append(text), 'flush': lambda self: None })()
+    try:
+      Dots.display("Lost")
+      # Assert the error of the frame is raised on the thread that waits for it
+      self.assertRaises(IOError, Dots.flush)
+      # Assert the error is raised only once
+      Dots.display("Found")
+      self.assertEqual(self.screen()[0], "Found           ",\
+          "Unexpected contents on screen: {}".format(self.lcd.screen()))
+    finally:
+      sys.stderr = stderr
+    # Assert the error is not printed
+    self.assertEqual(printed, [],\
+        "Error was printed: {}".format("".join(printed)))
+
+
+  def test_file(self):
+    descriptor, path = tempfile.mkstemp()
+    os.close(descriptor)
+    self.addCleanup(os.remove, path)
+    self.addCleanup(Dots.buffer().close)
+    with open(path, 'w') as log:
+      log.write("One\nTwo\nThr")
+    Dots.display_file(path)
+    # Assert the lines of the file are shown
+    self.assertEqual(self.screen(), ["One             ", "Two             "],\
+        "Unexpected contents on screen: {}".format(self.screen()))
+    self.assertEqual(Dots.buffer().line_count(), 3,\
+        "Expected 3 lines in buffer, found {}".format(Dots.buffer().line_count()))
+    # Assert lines appended to the file are added, completing the last line
+    first = Dots.line()
+    with open(path, 'a') as log:
+      log.write("ee\nFour\n")
+    self.assertEqual(Dots.buffer().refresh(), 1,\
+        "Unexpected number of lines added")
+    self.assertEqual(str(Dots.buffer()[2]).strip(), "Three",\
+        "Last line was not completed: {}".format(str(Dots.buffer()[2])))
+    self.assertTrue(Dots.line() is first, "Lines read before were parsed again")
+    # Assert a followed file scrolls along with the lines appended to it
+    Dots.display_file(path, follow=0.01)
+    Dots.scroll().down(2).once()
+    with open(path, 'a') as log:
+      log.write("Five\n")
+    time.sleep(0.05)
+    self.assertEqual(self.screen(), ["Four            ", "Five            "],\
+        "Screen did not follow the file: {}".format(self.screen()))
+    # Assert the file is no longer followed, and is closed, once other text is
+    # displayed
+    lines = Dots.buffer()._lines
+    Dots.display("Text")
+    self.assertTrue(lines._file.closed, "File was not closed")
+    with open(path, 'a') as log:
+      log.write("Six\n")
+    time.sleep(0.03)
+    self.assertEqual(Dots.buffer().line_count(), 1,\
+        "File was followed after displaying other text")
+
 
 if __name__ == "__main__":
-  Dots.init()
-  suite = unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase)
+  if "--virtual" in sys.argv:
+    Dots.init(transport=VirtualHD44780())
+  else:
+    Dots.init()
+  suite = unittest.TestSuite()
+  suite.addTests(unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase))
+  suite.addTests(unittest.TestLoader().loadTestsFromTestCase(RenderingTestCase))
   unittest.TextTestRunner(verbosity=2).run(suite)
 
@@ -18,9 +18,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-# TODO Implement reading data back from the controller through the rw pin
-#      Currently not implemented as voltage incompatibility between the HD44780
-#      and the RPi require a regulator so as not to burn the latter
+# NOTE Reading the busy flag back from the controller through the rw pin is
+#      optional. Voltage incompatibility between a HD44780 powered at 5V and
+#      the RPi requires a level shifter on the DB pins (or powering the
+#      controller at 3.3V) so as not to burn the latter
 #
 # Author and Maintainer
 # Ioannes Bracciano <john.bracciano@gmail.com>
@@ -100,14 +101,21 @@ __FLAG_5X8_FONT                       = 0b00000
 __FLAG_5X10_FONT                      = 0b00100
 
 
-from time import sleep
 from sys import modules
-from RPi import GPIO as GPIO
+from ifc.Transport import GPIOTransport, GroupedGPIOTransport, MemoryTransport
+
+
+try:
+  from RPi import GPIO as GPIO
+except (ImportError, RuntimeError):
+  # Not running on a pi. Only transports that do not drive the pins through
+  # RPi.GPIO can be used (see the VirtualHD44780 module)
+  GPIO = None
 
 
 # Default pin numbers (BCM numbering)
 PIN_DEFS = {
-    'rs':    21 if GPIO.RPI_REVISION==1 else 27,
+    'rs':    21 if GPIO and GPIO.RPI_REVISION==1 else 27,
     'e' :    22,
     'db':   [4, 25, 24, 23] }
 #            ^  ^   ^   ^
@@ -119,12 +127,46 @@ __DEFAULT_NUM_LINES = 1
 # Default font to use
 __DEFAULT_FONT = "5x8"
 
+# Pin levels of every instruction, precomputed per bit mode
+__levels_tables = {}
+
+# Time in seconds given to the controller to clear the display or return home
+# when its busy flag cannot be read (1.52ms according to the data-sheet)
+__LONG_DELAY = 0.002
+
+# Time in seconds after which a busy flag that is still set is considered
+# unreadable (no instruction takes nearly as long to execute)
+__BUSY_TIMEOUT = 0.01
+
 
 # Getting a pointer to this module
 this = modules[__name__]
 
 
-def init (pins=None):
+class _Controller(object):
+  """ Keeps the state of one controller: the pins it is wired to, the
+  transport that drives them and what the module needs to know to instruct it.
+  Returned by `init` as a handle to be given to `select`
+  """
+
+  __slots__ = ('pins', 'transport', 'bit_mode', 'busy_polling', 'ready_at',
+               'num_lines', 'levels')
+
+  def __init__(self, pins, transport):
+    self.pins = pins
+    self.transport = transport
+    self.bit_mode = None
+    self.busy_polling = False
+    self.ready_at = 0
+    self.num_lines = None
+    self.levels = None
+
+
+# The controller instructions are sent to (see `select`)
+this.__controller = None
+
+
+def init (pins=None, transport=None):
   """ Initialize the module and the controller
 
   If called with no arguments, it will be assumed that the display has been
@@ -135,10 +177,32 @@ def init (pins=None):
   module will configure the controller to either 4-bit mode or 8-bit mode
   automatically.
 
+  Several controllers can share the rs, rw and DB pins, each with its own `e`
+  pin, since a controller only latches the levels on the pins when its enable
+  pin is signaled. Each of them is initialized with its own pins and becomes
+  the selected controller, the one every other function of the module
+  instructs, until another one is selected (see `select`).
+
+  If the dictionary also defines an `'rw'` pin, the module polls the busy flag
+  of the controller and sends each instruction as soon as the previous one has
+  been executed. Otherwise every instruction is given a fixed delay to execute.
+
+  The pins are driven through a transport (see the Transport module), one
+  `RPi.GPIO` write per pin by default. Another transport can be given to use a
+  faster mechanism, if the host offers one, or to stand in for the hardware.
+
   Parameters
   ----------
   pins : {None, dict}, optional
        a python dictionary defining custom pin numbers
+  transport : {None, Transport}, optional
+       the transport that carries instructions to the controller.
+       Defaults to a `GPIOTransport`
+
+  Returns
+  -------
+  object
+      a handle to the controller, to be given to `select`
 
   Raises
   ------
@@ -161,45 +225,101 @@ def init (pins=None):
   >>     'e'  : 22,
   >>     'db' : [4, 25, 24, 23] }
   >> HD44780.init(pins)
+
+  To poll the busy flag instead of waiting a fixed delay, add the `'rw'` pin:
+
+  >> pins = {
+  >>     'rs' : 21,
+  >>     'rw' : 18,
+  >>     'e'  : 22,
+  >>     'db' : [4, 25, 24, 23] }
+  >> HD44780.init(pins)
+
+  To set all of the DB pins with a single write through lgpio:
+
+  >> HD44780.init(pins, GroupedGPIOTransport())
+
+  To run without a display, on any computer, against a virtual controller:
+
+  >> from ifc.VirtualHD44780 import VirtualHD44780
+  >> HD44780.init(transport=VirtualHD44780())
+
+  To drive two displays that share every pin but `e`, through one transport:
+
+  >> bus = GPIOTransport()
+  >> top = HD44780.init(dict(pins, e=22), bus)
+  >> bottom = HD44780.init(dict(pins, e=5), bus)
+  >> HD44780.select(top)
   """
   if pins:
     if "rs" not in pins or "e" not in pins or "db" not in pins:
       raise KeyError("Invalid format of pins dictionary.\
           Keys 'rs', 'e' and 'db' must be included")
 
-  this.__pins = pins or PIN_DEFS
-
-  GPIO.setmode(GPIO.BCM)
-  GPIO.setup(this.__pins['rs'], GPIO.OUT)
-  GPIO.output(this.__pins['rs'], GPIO.LOW)
-  GPIO.setup(this.__pins['e'], GPIO.OUT)
-  GPIO.output(this.__pins['e'], GPIO.LOW)
-  for i in range(len(this.__pins['db'])):
-    GPIO.setup(this.__pins['db'][i], GPIO.OUT)
-    GPIO.output(this.__pins['db'][i], GPIO.LOW)
-
-  this.__bit_mode = len(this.__pins['db'])
+  controller = _Controller(pins or PIN_DEFS, transport or GPIOTransport())
+  this.__controller = controller
+  transport = controller.transport
+  transport.setup(controller.pins)
+  controller.bit_mode = transport.bit_mode
 
   # Controller initialization process
-  GPIO.output(this.__pins['db'][2], GPIO.HIGH)
-  GPIO.output(this.__pins['db'][3], GPIO.HIGH)
-  __signal_enable()
-  sleep(0.005)
-  __signal_enable()
-  sleep(0.001)
-  __signal_enable()
-
-  if this.__bit_mode == 4:
-    GPIO.output(this.__pins['db'][3], GPIO.LOW)
-    __signal_enable()
-    sleep(0.001)
-
-  set_function(   bit_mode = len(this.__pins['db']),
+  wake_up = (0, 0, 1, 1) + (0, 0, 0, 0)[:controller.bit_mode - 4]
+  transport.send(0, wake_up)
+  transport.sleep(0.005)
+  transport.send(0, wake_up)
+  transport.sleep(0.001)
+  transport.send(0, wake_up)
+  transport.sleep(0.001)
+
+  if controller.bit_mode == 4:
+    transport.send(0, (0, 0, 1, 0))
+    transport.sleep(0.001)
+
+  # The busy flag can be checked from the first function set onwards
+  controller.busy_polling = transport.readable
+
+  set_function(   bit_mode = controller.bit_mode,
                   num_lines = this.__DEFAULT_NUM_LINES,
                   font = this.__DEFAULT_FONT   )
   display_off()
   clear()
   set_entry_mode("incr", False)
+  return controller
+
+
+def select(controller):
+  """ Select the controller that the rest of the functions instruct
+
+  Parameters
+  ----------
+  controller : object
+       a handle returned by `init`
+  """
+  this.__controller = controller
+  controller.transport.select(controller.pins)
+
+
+def selected():
+  """ Return the handle of the selected controller
+
+  Returns
+  -------
+  object
+      the handle returned by `init` for the controller that is instructed,
+      None if no controller has been initialized
+  """
+  return this.__controller
+
+
+def bit_mode():
+  """ Return the mode the selected controller is interfaced in
+
+  Returns
+  -------
+  {4, 8}
+      the number of DB pins the controller is driven through
+  """
+  return this.__controller.bit_mode
 
 
 def clear():
@@ -352,8 +472,10 @@ def set_function(bit_mode=4, num_lines=1, font="5x8"):
     raise ValueError("Invalid font: {}".format(font))
   
   # Keep number of lines and bit mode as they are needed for other functions
-  this.__bit_mode = bit_mode
-  this.__num_lines = num_lines
+  controller = this.__controller
+  controller.bit_mode = bit_mode
+  controller.num_lines = num_lines
+  controller.levels = __levels_table(bit_mode)
 
   __instruct(   this.__INSTR_FUNCTION_SET
               | (this.__FLAG_4_BITS if bit_mode == 4 else this.__FLAG_8_BITS)
@@ -404,7 +526,7 @@ def set_ddram_address(address):
   ValueError
        if `address` lies outside of DDRAM address space
   """
-  if this.__num_lines == 1:
+  if this.__controller.num_lines == 1:
     if address < 0x00 or address > 0x4f:
       raise ValueError("Invalid DDRAM address set: {}\
           DDRAM address space spans from 0x00 to 0x4f (1 line)".format(address))
@@ -432,61 +554,118 @@ def write(stuff):
   """
   if isinstance(stuff, list):
     for byte in stuff:
-      __instruct(this.__INSTR_WRITE | (byte & 0xff))
+      __instruct(this.__INSTR_WRITE | (byte & 0xff), flush=False)
   elif isinstance(stuff, str):
     for char in stuff:
-      __instruct(this.__INSTR_WRITE | ord(char))
+      __instruct(this.__INSTR_WRITE | (ord(char) & 0xff), flush=False)
   elif isinstance(stuff, int):
-    __instruct(this.__INSTR_WRITE | (stuff & 0xff))
+    __instruct(this.__INSTR_WRITE | (stuff & 0xff), flush=False)
 
+  # Transports that batch their writes send the whole of `stuff` at once
+  this.__controller.transport.flush()
 
-def __signal_enable():
-  """ Passes the instruction carried on the pins to the controller
-  """
-  GPIO.output(this.__pins['e'], GPIO.HIGH)
-  GPIO.output(this.__pins['e'], GPIO.LOW)
 
+def saved_writes():
+  """ Return how many writes to each pin were skipped because the pin was
+  already driven to the requested level
 
-def __instruct(instruction):
-  """ Prepares the instruction to be sent to the controller
+  Returns
+  -------
+  dict
+      the number of skipped writes, keyed by pin number
   """
-  # Prepare bits
-  bits = bin(instruction)[2:].zfill(10)
-  # Prepare rs pin
-  GPIO.output(this.__pins['rs'], int(bits[0]))
-  
-  if this.__bit_mode == 4:
-    __instruct_4_bit_mode(bits)
-  else:
-    __instruct_8_bit_mode(bits)
+  return this.__controller.transport.saved_writes()
+
 
-  # To ensure instruction has been fully processed by the controller before
-  # sending another one
-  # TODO Use that only when there is no possibility of reading the busy state
-  # indicator from the controller
-  sleep(0.001)
+def ready_in():
+  """ Return how many seconds are left until the controller can accept a new
+  instruction, so that callers who must not block (an event loop, for
+  instance) can wait for them their own way before the next instruction
 
+  When the busy flag is polled, the wait is never longer than the execution of
+  a single instruction and is left to the next instruction itself
 
-def __instruct_4_bit_mode(bits):
-  """ Breaks the instruction into 2 chunks of 4 bits that are sequentially sent
-  to the controller
+  Returns
+  -------
+  float
+      the seconds left, 0 if the controller is ready
   """
-  for i in range(2,6):
-    GPIO.output(this.__pins['db'][i-2], int(bits[i]))
+  controller = this.__controller
+  if controller.busy_polling:
+    return 0
+  return max(controller.ready_at - controller.transport.clock(), 0)
+
 
-  __signal_enable()
+def __instruct(instruction, flush=True):
+  """ Prepares the instruction to be sent to the controller
 
-  for i in range(6,10):
-    GPIO.output(this.__pins['db'][i-6], int(bits[i]))
+  Unless `flush` is False, transports that batch their writes are flushed
+  right after the instruction
+  """
+  # Make sure the previous instruction has been fully processed by the
+  # controller before sending another one
+  controller = this.__controller
+  transport = controller.transport
+  __wait_until_ready()
+
+  # Look up the pin levels of the instruction and send them in one chunk of
+  # 8 bits, or in two chunks of 4 bits in 4-bit mode
+  levels = controller.levels[instruction]
+  for chunk in levels[1:]:
+    transport.send(levels[0], chunk)
+
+  if not controller.busy_polling:
+    if instruction in (this.__INSTR_CLR_DISP, this.__INSTR_RET_HOME):
+      controller.ready_at = transport.clock() + this.__LONG_DELAY
+    else:
+      controller.ready_at = transport.clock() + transport.fixed_delay
+
+  if flush:
+    transport.flush()
+
+
+def __wait_until_ready():
+  """ Blocks until the controller is ready to accept a new instruction
+
+  The busy flag is polled if the transport can read it. Otherwise the fixed
+  delay given to the last instruction is waited, minus the time that has
+  already passed since it was sent.
+  If the flag stays set for longer than any instruction could take to execute,
+  it is considered unreadable and the module falls back to fixed delays
+  """
+  controller = this.__controller
+  transport = controller.transport
 
-  __signal_enable()
+  if controller.busy_polling:
+    if not transport.wait_while_busy(this.__BUSY_TIMEOUT):
+      controller.busy_polling = False
+      transport.sleep(this.__LONG_DELAY)
+  else:
+    remaining = controller.ready_at - transport.clock()
+    if remaining > 0:
+      transport.sleep(remaining)
 
 
-def __instruct_8_bit_mode(bits):
-  """ Sends the instruction to the controller
+def __levels_table(bit_mode):
+  """ Returns the levels the pins must be driven to for each of the 1024
+  possible instructions, indexed by the instruction itself
+
+  Each entry holds the level of the rs pin, followed by the levels of the DB
+  pins (DB7 first) in one chunk of 8 bits, or in two chunks of 4 bits in 4-bit
+  mode. The table of each bit mode is computed only once
   """
-  for i in range(2,10):
-    GPIO.output(this.__pins['db'][i-2], int(bits[i]))
+  if bit_mode not in this.__levels_tables:
+    table = []
+
+    for instruction in range(1024):
+      rs = (instruction >> 9) & 1
+      db = tuple((instruction >> i) & 1 for i in range(7, -1, -1))
+
+      if bit_mode == 4:
+        table += [ (rs, db[:4], db[4:]) ]
+      else:
+        table += [ (rs, db) ]
 
-  __signal_enable()
+    this.__levels_tables[bit_mode] = tuple(table)
 
+  return this.__levels_tables[bit_mode]
@@ -0,0 +1,70 @@
+# Python script to test how HD44780.py waits for the controller, against a fake
+# transport that can read the busy flag
+# Run from the root of the repository with: python -m ifc.HD44780_Test
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import unittest
+from ifc import HD44780
+from ifc.Transport import MemoryTransport
+
+
+# Keeps what is sent in memory, as MemoryTransport does, and reads a busy flag
+# that is cleared right away, or stays set if 'stuck' is True
+class PollingTransport(MemoryTransport):
+
+  readable = True
+
+  def __init__(self, stuck=False):
+    MemoryTransport.__init__(self)
+    self.stuck = stuck
+    self.polls = 0
+
+  def wait_while_busy(self, timeout):
+    self.polls += 1
+    if self.stuck:
+      self._now += timeout
+      return False
+    return True
+
+
+class SimpleTestCase(unittest.TestCase):
+
+  def test_polling(self):
+    transport = PollingTransport()
+    HD44780.init(transport=transport)
+    polls, start = transport.polls, transport.clock()
+    HD44780.write("Hello")
+    # Assert the busy flag is read before every instruction
+    self.assertEqual(transport.polls - polls, 5,\
+        "Expected 5 reads of the busy flag, found {}".format(transport.polls - polls))
+    # Assert no fixed delay is waited while the flag is read
+    self.assertEqual(transport.clock(), start,\
+        "Fixed delays were waited: {}s".format(transport.clock() - start))
+    self.assertEqual(HD44780.ready_in(), 0,\
+        "Unexpected time until ready: {}".format(HD44780.ready_in()))
+
+
+  def test_fallback(self):
+    transport = PollingTransport(stuck=True)
+    HD44780.init(transport=transport)
+    # Assert a flag that stays set is read only once, by the first instruction
+    self.assertEqual(transport.polls, 1,\
+        "Expected 1 read of the busy flag, found {}".format(transport.polls))
+    # Assert every instruction is given the fixed delay from then on
+    start = transport.clock()
+    HD44780.write("Hello")
+    self.assertEqual(transport.polls, 1,\
+        "Busy flag was read after falling back: {}".format(transport.polls))
+    self.assertAlmostEqual(transport.clock() - start, 5 * transport.fixed_delay,
+        msg="Unexpected time waited: {}s".format(transport.clock() - start))
+    self.assertTrue(HD44780.ready_in() > 0,\
+        "Fixed delay of the last instruction is not waited")
+
+
+
+if __name__ == "__main__":
+  suite = unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,155 @@
+# Copyright (c) 2017 Ioannes Bracciano
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+"""
+  This module provides a transport for HD44780 controllers that are connected
+  through a PCF8574 I2C port expander, like the common LCD "backpacks"
+"""
+
+
+from time import sleep
+from ifc.Transport import Transport
+
+
+# Bits of the port expander and the pins of the controller they are wired to
+# P7 P6 P5 P4 P3 P2 P1 P0
+# D7 D6 D5 D4 BL E  RW RS
+_RS = 0b00000001
+_E  = 0b00000100
+_BL = 0b00001000
+
+# The most bytes an SMBus block write can carry, after its first byte
+_MAX_BLOCK = 32
+
+
+class PCF8574Transport(Transport):
+  """ Drives the controller in 4-bit mode through a PCF8574 I2C backpack
+
+  Each nibble costs two bytes on the bus, one with enable high and one with
+  enable low, plus one more whenever the level of the rs pin changes. Nibbles
+  are batched until `flush` is called, so a whole string goes out in a single
+  bus transaction (or in as few blocks of 32 bytes as an SMBus allows).
+
+  Parameters
+  ----------
+  bus : {int, object}, optional
+       the number of the I2C bus, or an already opened SMBus object
+  address : int, optional
+       the I2C address of the backpack
+  backlight : {True, False}, optional
+       whether to keep the backlight on
+  frequency : int, optional
+       the clock frequency of the I2C bus in Hz
+  smbus2 : {None, module}, optional
+       the module whose `i2c_msg` batches a flush into a single transaction,
+       on buses that support `i2c_rdwr`. `smbus2` by default, imported only
+       for such buses
+  """
+
+  # The controller executes most instructions in 37us (more on slow clones).
+  # The bus takes longer than that to clock out the next instruction, so this
+  # delay never has to be waited for
+  fixed_delay = 0.00005
+
+  def __init__(self, bus=1, address=0x27, backlight=True, frequency=100000,
+               smbus2=None):
+    if isinstance(bus, int):
+      bus = _open_bus(bus)
+    self._bus = bus
+
+    # Buses that carry a whole batch in one transaction are given it that way
+    self._i2c_msg = None
+    if hasattr(bus, 'i2c_rdwr'):
+      if smbus2 is None:
+        import smbus2
+      self._i2c_msg = smbus2.i2c_msg
+    self._address = address
+    self._backlight = _BL if backlight else 0
+
+    # Two bytes (9 bits each) are clocked out before the next nibble is
+    # latched by the controller
+    self._latch_time = 2 * 9.0 / frequency
+
+    self._bytes = {}
+    self._batch = []
+    self._last = None
+
+  def setup(self, pins):
+    # The backpack is always wired in 4-bit mode and cannot read the busy flag
+    self.bit_mode = 4
+    self._batch = [ self._backlight ]
+    self._last = self._backlight
+    self.flush()
+
+  def send(self, rs, levels):
+    byte = self._bytes.get((rs, levels))
+    if byte is None:
+      byte = self._backlight | (_RS if rs else 0)
+      for i, level in enumerate(levels):
+        byte |= level << (7 - i)
+      self._bytes[(rs, levels)] = byte
+
+    # The rs pin must settle before enable rises, while data only needs to
+    # settle before enable falls
+    if (byte ^ self._last) & _RS:
+      self._batch += [ byte ]
+    self._batch += [ byte | _E, byte ]
+    self._last = byte
+
+  def flush(self):
+    batch, self._batch = self._batch, []
+    if not batch:
+      return
+
+    if self._i2c_msg:
+      self._bus.i2c_rdwr(self._i2c_msg.write(self._address, batch))
+    else:
+      for i in range(0, len(batch), _MAX_BLOCK + 1):
+        block = batch[i : i + _MAX_BLOCK + 1]
+        if len(block) == 1:
+          self._bus.write_byte(self._address, block[0])
+        else:
+          self._bus.write_i2c_block_data(self._address, block[0], block[1:])
+
+  def wait_while_busy(self, timeout):
+    # The rw pin of the backpack is held low, so the busy flag is never read
+    # and the fixed delays are waited instead
+    return True
+
+  def sleep(self, seconds):
+    # Short delays pass while the next bytes are clocked out on the bus
+    if seconds > self._latch_time:
+      self.flush()
+      sleep(seconds)
+
+
+def _open_bus(number):
+  """ Opens the I2C bus with `smbus2`, or with `smbus` if the former is not
+  installed
+  """
+  try:
+    from smbus2 import SMBus
+  except ImportError:
+    from smbus import SMBus
+  return SMBus(number)
@@ -0,0 +1,110 @@
+# Python script to test the functionality of PCF8574.py against a fake SMBus
+# Run from the root of the repository with: python -m ifc.PCF8574_Test
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import unittest
+from ifc.PCF8574 import PCF8574Transport
+
+
+# Records the transactions an SMBus would carry to the backpack
+class FakeSMBus:
+
+  def __init__(self):
+    self.transactions = []
+
+  def write_byte(self, address, value):
+    self.transactions += [ (address, [value]) ]
+
+  def write_i2c_block_data(self, address, register, data):
+    self.transactions += [ (address, [register] + list(data)) ]
+
+
+# Records the transactions of an SMBus that can carry a whole batch at once
+class FakeRdwrSMBus(FakeSMBus):
+
+  def i2c_rdwr(self, *messages):
+    for address, data in messages:
+      self.transactions += [ (address, data) ]
+
+
+# Stands in for smbus2, whose messages are kept as (address, bytes) pairs
+class FakeSMBus2:
+
+  class i2c_msg:
+
+    @staticmethod
+    def write(address, data):
+      return (address, list(data))
+
+
+class SimpleTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.bus = FakeSMBus()
+    self.transport = PCF8574Transport(self.bus, address=0x3f)
+    self.transport.setup(None)
+    self.bus.transactions = []
+
+
+  def test_packing(self):
+    # Send the character 'A' (0x41) in two nibbles
+    self.transport.send(1, (0, 1, 0, 0))
+    self.transport.send(1, (0, 0, 0, 1))
+    self.transport.flush()
+    # Assert rs settles once, then every nibble is clocked with enable high
+    # and low, while the backlight stays on
+    self.assertEqual(self.bus.transactions,
+        [ (0x3f, [0x49, 0x4d, 0x49, 0x1d, 0x19]) ],
+        "Unexpected bytes on the bus: {}".format(self.bus.transactions))
+
+
+  def test_batching(self):
+    # Send 16 characters before flushing
+    for i in range(16):
+      self.transport.send(1, (0, 1, 0, 0))
+      self.transport.send(1, (0, 0, 0, 1))
+    # Assert nothing is sent before flushing
+    self.assertEqual(self.bus.transactions, [],
+        "Bytes sent before flushing: {}".format(self.bus.transactions))
+    self.transport.flush()
+    # Assert 1 + 16 * 4 bytes were sent in blocks of at most 33 bytes
+    self.assertEqual([len(t[1]) for t in self.bus.transactions], [33, 32],
+        "Unexpected transactions: {}".format(self.bus.transactions))
+
+
+  def test_rdwr(self):
+    bus = FakeRdwrSMBus()
+    transport = PCF8574Transport(bus, address=0x3f, smbus2=FakeSMBus2)
+    transport.setup(None)
+    bus.transactions = []
+    # Send 16 characters before flushing
+    for i in range(16):
+      transport.send(1, (0, 1, 0, 0))
+      transport.send(1, (0, 0, 0, 1))
+    transport.flush()
+    # Assert the whole batch went out in a single transaction
+    self.assertEqual(bus.transactions,
+        [ (0x3f, [0x49] + [0x4d, 0x49, 0x1d, 0x19] * 16) ],
+        "Unexpected bytes on the bus: {}".format(bus.transactions))
+
+
+  def test_sleeping(self):
+    self.transport.send(0, (0, 0, 0, 0))
+    # Assert delays shorter than the bus needs to latch the next nibble do not
+    # flush the batch
+    self.transport.sleep(0.00005)
+    self.assertEqual(self.bus.transactions, [],
+        "Short delay flushed the batch: {}".format(self.bus.transactions))
+    # Assert longer delays flush it
+    self.transport.sleep(0.002)
+    self.assertEqual(len(self.bus.transactions), 1,
+        "Long delay did not flush the batch: {}".format(self.bus.transactions))
+
+
+
+if __name__ == "__main__":
+  suite = unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,408 @@
+# Copyright (c) 2017 Ioannes Bracciano
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+"""
+  This module provides the transports the HD44780 module can use to carry
+  instructions to the controller. A transport puts the levels of the RS and DB
+  pins on the wire and signals enable, while the HD44780 module decides which
+  levels to send and when
+"""
+
+
+from abc import ABCMeta, abstractmethod
+from time import sleep
+
+try:
+  from time import monotonic
+except ImportError:
+  from time import time as monotonic
+
+
+# Base of abstract classes, on Python 2 as well as on Python 3
+_Abstract = ABCMeta('_Abstract', (object,), {})
+
+
+class Transport(_Abstract):
+  """ Base class of all transports
+
+  A transport implements `setup`, `send` and `wait_while_busy`, and cannot be
+  created before it does
+
+  Attributes
+  ----------
+  bit_mode : {4, 8}
+       the number of DB lines the transport drives, known after `setup`
+  readable : bool
+       whether the transport can read the busy flag of the controller
+  fixed_delay : float
+       time in seconds given to the controller to execute an instruction when
+       its busy flag cannot be read
+  """
+
+  bit_mode = None
+  readable = False
+  fixed_delay = 0.001
+
+  @abstractmethod
+  def setup(self, pins):
+    """ Prepare the transport to drive the given pins
+
+    Parameters
+    ----------
+    pins : dict
+         the pin numbers, as given to `HD44780.init`
+    """
+    pass
+
+  @abstractmethod
+  def send(self, rs, levels):
+    """ Drive the rs pin and the DB pins to the given levels and signal enable
+    so the controller latches them
+
+    Parameters
+    ----------
+    rs : {0, 1}
+         the level of the rs pin
+    levels : tuple
+         the levels of the DB pins, DB7 first
+    """
+    pass
+
+  def select(self, pins):
+    """ Make the controller wired to `pins` the one that latches what is sent
+    from now on. Transports that drive several controllers, on the same rs,
+    rw and DB pins and on a different `e` pin each, signal the enable pin of
+    the selected one. Transports of a single controller have nothing to do
+
+    Parameters
+    ----------
+    pins : dict
+         the pin numbers of the controller, as given to `setup`
+    """
+    pass
+
+  def flush(self):
+    """ Send whatever the transport has batched so far. Transports that write
+    to the pins right away have nothing to flush
+    """
+    pass
+
+  @abstractmethod
+  def wait_while_busy(self, timeout):
+    """ Read the busy flag until the controller reports it is ready
+
+    Parameters
+    ----------
+    timeout : float
+         time in seconds after which to stop reading the flag
+
+    Returns
+    -------
+    bool
+        True if the controller became ready, False if the flag was still set
+        after `timeout` seconds
+    """
+    pass
+
+  def clock(self):
+    """ Return the current time in seconds, as counted by the transport
+    """
+    return monotonic()
+
+  def sleep(self, seconds):
+    """ Let `seconds` pass while the controller executes an instruction
+    """
+    sleep(seconds)
+
+  def saved_writes(self):
+    """ Return how many pin writes were skipped because the pins were already
+    driven to the requested levels, keyed by pin number
+    """
+    return {}
+
+
+class GPIOTransport(Transport):
+  """ Drives each pin separately through `RPi.GPIO`
+
+  Pins are only written when their level changes. Any object implementing the
+  same functions as `RPi.GPIO` (a simulated controller, for instance) can be
+  given to stand in for the hardware. Controllers that share every pin but `e`
+  are driven through the same transport, set up once for each of them.
+
+  Parameters
+  ----------
+  gpio : {None, module}, optional
+       the GPIO module to use, `RPi.GPIO` by default
+  """
+
+  def __init__(self, gpio=None):
+    if gpio is None:
+      from RPi import GPIO as gpio
+    self._gpio = gpio
+
+  def setup(self, pins):
+    GPIO = self._gpio
+    self._rs = pins['rs']
+    self._e = pins['e']
+    self._db = pins['db']
+    self._rw = pins.get('rw')
+    self.bit_mode = len(self._db)
+    self.readable = self._rw is not None
+
+    self._driven = {}
+    self._saved_writes = {}
+
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(self._rs, GPIO.OUT)
+    self._output(self._rs, GPIO.LOW)
+    GPIO.setup(self._e, GPIO.OUT)
+    GPIO.output(self._e, GPIO.LOW)
+    for pin in self._db:
+      GPIO.setup(pin, GPIO.OUT)
+      self._output(pin, GPIO.LOW)
+    if self.readable:
+      GPIO.setup(self._rw, GPIO.OUT)
+      self._output(self._rw, GPIO.LOW)
+
+  def select(self, pins):
+    self._e = pins['e']
+
+  def send(self, rs, levels):
+    self._output(self._rs, rs)
+    for pin, level in zip(self._db, levels):
+      self._output(pin, level)
+    self._signal_enable()
+
+  def wait_while_busy(self, timeout):
+    GPIO = self._gpio
+    self._output(self._rs, GPIO.LOW)
+    self._output(self._rw, GPIO.HIGH)
+    for pin in self._db:
+      GPIO.setup(pin, GPIO.IN)
+
+    timeout += self.clock()
+    ready = True
+    while self._read_busy_flag():
+      if self.clock() > timeout:
+        ready = False
+        break
+
+    # Drive the DB pins back to the levels they had before they were read
+    for pin in self._db:
+      GPIO.setup(pin, GPIO.OUT, initial=self._driven[pin])
+    self._output(self._rw, GPIO.LOW)
+
+    return ready
+
+  def saved_writes(self):
+    return dict(self._saved_writes)
+
+  def _read_busy_flag(self):
+    """ Reads the busy flag (DB7) while the controller outputs its busy flag
+    and address counter. In 4-bit mode the second nibble is clocked out and
+    ignored
+    """
+    GPIO = self._gpio
+    GPIO.output(self._e, GPIO.HIGH)
+    busy = GPIO.input(self._db[0])
+    GPIO.output(self._e, GPIO.LOW)
+
+    if self.bit_mode == 4:
+      self._signal_enable()
+
+    return busy
+
+  def _output(self, pin, level):
+    """ Drives `pin` to `level`, unless it was last driven to the same level
+    """
+    if self._driven.get(pin) == level:
+      self._saved_writes[pin] = self._saved_writes.get(pin, 0) + 1
+    else:
+      self._gpio.output(pin, level)
+      self._driven[pin] = level
+
+  def _signal_enable(self):
+    """ Passes the levels carried on the pins to the controller
+    """
+    self._gpio.output(self._e, self._gpio.HIGH)
+    self._gpio.output(self._e, self._gpio.LOW)
+
+
+class GroupedGPIOTransport(Transport):
+  """ Drives the rs pin and all of the DB pins with a single group write
+  through `lgpio`, instead of one write per pin
+
+  The group is written only when its levels change. Controllers that share
+  every pin but `e` are driven through the same transport, set up once for
+  each of them.
+
+  Parameters
+  ----------
+  chip : int, optional
+       the number of the gpiochip the pins belong to
+  lgpio : {None, module}, optional
+       the lgpio module to use, `lgpio` by default
+  """
+
+  def __init__(self, chip=0, lgpio=None):
+    if lgpio is None:
+      import lgpio
+    self._lgpio = lgpio
+    self._handle = lgpio.gpiochip_open(chip)
+
+  def setup(self, pins):
+    lgpio, handle = self._lgpio, self._handle
+    group = [pins['rs']] + list(pins['db'])
+    self._e = pins['e']
+
+    # The group is claimed once, by the first of the controllers sharing it
+    if group == getattr(self, '_group', None):
+      lgpio.gpio_claim_output(handle, self._e, 0)
+      return
+
+    self._rs = pins['rs']
+    self._db = pins['db']
+    self._rw = pins.get('rw')
+    self.bit_mode = len(self._db)
+    self.readable = self._rw is not None
+
+    # Bit i of a group write sets the level of the i-th pin in the group
+    self._group = group
+    self._group_bits = {}
+    self._written = 0
+    self._full_mask = (1 << len(group)) - 1
+
+    # How many times the pins of each mask kept their level when the group was
+    # sent, keyed by mask (see saved_writes)
+    self._unchanged = {}
+
+    lgpio.group_claim_output(handle, self._group, [0] * len(self._group))
+    lgpio.gpio_claim_output(handle, self._e, 0)
+    if self.readable:
+      lgpio.gpio_claim_output(handle, self._rw, 0)
+
+  def select(self, pins):
+    self._e = pins['e']
+
+  def send(self, rs, levels):
+    bits = self._group_bits.get((rs, levels))
+    if bits is None:
+      bits = 0
+      for i, level in enumerate((rs,) + tuple(levels)):
+        bits |= level << i
+      self._group_bits[(rs, levels)] = bits
+
+    unchanged = ~(bits ^ self._written) & self._full_mask
+    self._unchanged[unchanged] = self._unchanged.get(unchanged, 0) + 1
+    if bits != self._written:
+      self._lgpio.group_write(self._handle, self._rs, bits)
+      self._written = bits
+
+    self._signal_enable()
+
+  def wait_while_busy(self, timeout):
+    lgpio, handle = self._lgpio, self._handle
+    lgpio.group_free(handle, self._rs)
+    lgpio.gpio_claim_output(handle, self._rs, 0)
+    lgpio.group_claim_input(handle, self._db)
+    lgpio.gpio_write(handle, self._rw, 1)
+
+    timeout += self.clock()
+    ready = True
+    while self._read_busy_flag():
+      if self.clock() > timeout:
+        ready = False
+        break
+
+    # Claim the group back at the levels it had before the flag was read
+    lgpio.gpio_write(handle, self._rw, 0)
+    lgpio.group_free(handle, self._db[0])
+    lgpio.gpio_free(handle, self._rs)
+    lgpio.group_claim_output(handle, self._group,
+        [(self._written >> i) & 1 for i in range(len(self._group))])
+
+    return ready
+
+  def saved_writes(self):
+    """ Return how many times each pin of the group was sent the level it was
+    already driven to. The group is written only when one of its pins changes,
+    but each pin is counted on its own, as if it were written separately
+    """
+    return dict((pin, sum(count for mask, count in self._unchanged.items()
+                          if mask >> i & 1))
+                for i, pin in enumerate(self._group))
+
+  def _read_busy_flag(self):
+    """ Reads the busy flag (DB7). In 4-bit mode the second nibble is clocked
+    out and ignored
+    """
+    lgpio, handle = self._lgpio, self._handle
+    lgpio.gpio_write(handle, self._e, 1)
+    busy = lgpio.gpio_read(handle, self._db[0])
+    lgpio.gpio_write(handle, self._e, 0)
+
+    if self.bit_mode == 4:
+      self._signal_enable()
+
+    return busy
+
+  def _signal_enable(self):
+    """ Passes the levels carried on the pins to the controller
+    """
+    self._lgpio.gpio_write(self._handle, self._e, 1)
+    self._lgpio.gpio_write(self._handle, self._e, 0)
+
+
+class MemoryTransport(Transport):
+  """ Keeps everything sent to the controller in memory instead of driving
+  any pins
+
+  Time is simulated, so instructions cost no real time to execute.
+
+  Attributes
+  ----------
+  sent : list
+       the (rs, levels) pairs sent to the controller, in order
+  """
+
+  def __init__(self):
+    self.sent = []
+    self._now = 0.0
+
+  def setup(self, pins):
+    self.bit_mode = len(pins['db'])
+    self.sent = []
+
+  def send(self, rs, levels):
+    self.sent += [ (rs, tuple(levels)) ]
+
+  def wait_while_busy(self, timeout):
+    # There is no busy flag to read, the controller is always ready
+    return True
+
+  def clock(self):
+    return self._now
+
+  def sleep(self, seconds):
+    self._now += seconds
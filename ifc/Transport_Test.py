@@ -0,0 +1,214 @@
+# Python script to test the functionality of Transport.py
+# Run from the root of the repository with: python -m ifc.Transport_Test
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import unittest
+from ifc.Transport import Transport, GPIOTransport, GroupedGPIOTransport,\
+                          MemoryTransport
+
+
+# The pins of a controller in 4-bit mode, DB7 first
+PINS = { 'rs': 7, 'e': 8, 'rw': 11, 'db': (25, 24, 23, 18) }
+
+
+# A transport that can send but forgot to read the busy flag
+class IncompleteTransport(Transport):
+
+  def setup(self, pins):
+    pass
+
+  def send(self, rs, levels):
+    pass
+
+
+# Stands in for the RPi.GPIO module: keeps the level and the mode of every pin,
+# and counts the writes of each one
+class FakeGPIO(object):
+
+  BCM, OUT, IN, LOW, HIGH = 'BCM', 'OUT', 'IN', 0, 1
+
+  def __init__(self):
+    self.levels = {}
+    self.inputs = set()
+    self.writes = {}
+    # Reads of the busy flag that find it set, before it is cleared
+    self.busy_reads = 0
+    # The levels of the pins at the last read of the busy flag
+    self.read_levels = None
+
+  def setmode(self, mode):
+    self.mode = mode
+
+  def setup(self, pin, mode, initial=None):
+    if mode == self.IN:
+      self.inputs.add(pin)
+    else:
+      self.inputs.discard(pin)
+      if initial is not None:
+        self.levels[pin] = initial
+
+  def output(self, pin, level):
+    assert pin not in self.inputs, "Pin {} written as input".format(pin)
+    self.levels[pin] = level
+    self.writes[pin] = self.writes.get(pin, 0) + 1
+
+  def input(self, pin):
+    assert pin in self.inputs, "Pin {} read as output".format(pin)
+    self.read_levels = dict(self.levels)
+    if self.busy_reads:
+      self.busy_reads -= 1
+      return 1
+    return 0
+
+
+# Stands in for the lgpio module: keeps the level and the mode of every pin,
+# and counts the writes of each group
+class FakeLgpio(object):
+
+  def __init__(self):
+    self.levels = {}
+    self.inputs = set()
+    self.groups = {}
+    self.group_writes = 0
+    # Reads of the busy flag that find it set, before it is cleared
+    self.busy_reads = 0
+    # The levels of the pins at the last read of the busy flag
+    self.read_levels = None
+
+  def gpiochip_open(self, chip):
+    return chip
+
+  def gpio_claim_output(self, handle, pin, level):
+    self.inputs.discard(pin)
+    self.levels[pin] = level
+
+  def gpio_free(self, handle, pin):
+    pass
+
+  def gpio_write(self, handle, pin, level):
+    assert pin not in self.inputs, "Pin {} written as input".format(pin)
+    self.levels[pin] = level
+
+  def gpio_read(self, handle, pin):
+    assert pin in self.inputs, "Pin {} read as output".format(pin)
+    self.read_levels = dict(self.levels)
+    if self.busy_reads:
+      self.busy_reads -= 1
+      return 1
+    return 0
+
+  def group_claim_output(self, handle, pins, levels):
+    self.groups[pins[0]] = list(pins)
+    for pin, level in zip(pins, levels):
+      self.gpio_claim_output(handle, pin, level)
+
+  def group_claim_input(self, handle, pins):
+    self.groups[pins[0]] = list(pins)
+    self.inputs.update(pins)
+
+  def group_free(self, handle, pin):
+    del self.groups[pin]
+
+  def group_write(self, handle, pin, bits):
+    self.group_writes += 1
+    for i, member in enumerate(self.groups[pin]):
+      self.gpio_write(handle, member, bits >> i & 1)
+
+
+class SimpleTestCase(unittest.TestCase):
+
+  def test_interface(self):
+    # Assert an incomplete transport cannot be created
+    with self.assertRaises(TypeError):
+      IncompleteTransport()
+    # Assert a complete one can
+    transport = MemoryTransport()
+    self.assertTrue(transport.wait_while_busy(0.01),\
+        "Memory transport reported a busy controller")
+
+
+  def test_saved_writes(self):
+    gpio = FakeGPIO()
+    transport = GPIOTransport(gpio=gpio)
+    transport.setup(PINS)
+    writes = dict(gpio.writes)
+    # Assert only the pins whose level changes are written
+    transport.send(0, (0, 0, 1, 1))
+    transport.send(0, (0, 0, 1, 1))
+    self.assertEqual(dict((pin, gpio.writes[pin] - writes[pin]) for pin in writes),\
+        { 7: 0, 8: 4, 11: 0, 25: 0, 24: 0, 23: 1, 18: 1 },\
+        "Unexpected pin writes: {}".format(gpio.writes))
+    # Assert each pin counts the writes it was spared
+    self.assertEqual(transport.saved_writes(),\
+        { 7: 2, 25: 2, 24: 2, 23: 1, 18: 1 },\
+        "Unexpected saved writes: {}".format(transport.saved_writes()))
+
+
+  def test_grouped_saved_writes(self):
+    lgpio = FakeLgpio()
+    transport = GroupedGPIOTransport(lgpio=lgpio)
+    transport.setup(PINS)
+    # Assert the group is written only when one of its pins changes
+    transport.send(0, (0, 0, 1, 1))
+    transport.send(0, (0, 0, 1, 1))
+    transport.send(1, (0, 0, 1, 0))
+    self.assertEqual(lgpio.group_writes, 2,\
+        "Expected 2 group writes, found {}".format(lgpio.group_writes))
+    # Assert each pin counts the times it was sent the level it already had
+    self.assertEqual(transport.saved_writes(),\
+        { 7: 2, 25: 3, 24: 3, 23: 2, 18: 1 },\
+        "Unexpected saved writes: {}".format(transport.saved_writes()))
+
+
+  def test_gpio(self):
+    self.check_pins(FakeGPIO(), lambda gpio: GPIOTransport(gpio=gpio))
+
+
+  def test_grouped_gpio(self):
+    self.check_pins(FakeLgpio(), lambda lgpio: GroupedGPIOTransport(lgpio=lgpio))
+
+
+  # Checks the levels 'transport(module)' drives the pins of the fake 'module'
+  # to, while sending and while reading the busy flag
+  def check_pins(self, module, transport):
+    transport = transport(module)
+    transport.setup(PINS)
+    self.assertTrue(transport.readable, "Transport with rw pin cannot read")
+    # Assert the levels sent are driven on the rs and DB pins, and enable is
+    # left low once they are latched
+    transport.send(1, (1, 0, 1, 1))
+    levels = dict(module.levels)
+    self.assertEqual([ levels[pin] for pin in (7, 25, 24, 23, 18, 8, 11) ],\
+        [1, 1, 0, 1, 1, 0, 0], "Unexpected pin levels: {}".format(levels))
+    # Assert the busy flag is read with the DB pins as inputs, rw high and rs
+    # low, until it is cleared
+    module.busy_reads = 3
+    self.assertTrue(transport.wait_while_busy(1),\
+        "Controller was not ready before the timeout")
+    self.assertEqual(module.busy_reads, 0,\
+        "Busy flag was not read until cleared: {}".format(module.busy_reads))
+    self.assertEqual((module.read_levels[11], module.read_levels[7]), (1, 0),\
+        "Unexpected rw and rs levels while reading: {}".format(module.read_levels))
+    # Assert the DB pins are outputs again, at the levels they had before
+    self.assertEqual(module.inputs & set(PINS['db']), set(),\
+        "DB pins left as inputs: {}".format(module.inputs))
+    self.assertEqual([ module.levels[pin] for pin in PINS['db'] + (11,) ],\
+        [1, 0, 1, 1, 0], "Unexpected pin levels: {}".format(module.levels))
+    # Assert a flag that stays set is given up on after the timeout
+    module.busy_reads = 10 ** 9
+    self.assertFalse(transport.wait_while_busy(0.01),\
+        "Controller reported ready while the busy flag was set")
+    self.assertEqual(module.inputs & set(PINS['db']), set(),\
+        "DB pins left as inputs: {}".format(module.inputs))
+    # Assert the transport can send again after reading
+    transport.send(0, (0, 1, 0, 0))
+    self.assertEqual([ module.levels[pin] for pin in (7,) + PINS['db'] ],\
+        [0, 0, 1, 0, 0], "Unexpected pin levels: {}".format(module.levels))
+
+
+if __name__ == "__main__":
+  suite = unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,271 @@
+# Copyright (c) 2017 Ioannes Bracciano
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+"""
+  This module provides a virtual HD44780 controller, that can be given to
+  `HD44780.init` as a transport in place of the hardware. It decodes the levels
+  sent on the pins the way the controller would and keeps the contents of its
+  memory, so the text on the screen can be inspected on any computer. Time is
+  simulated, as well as how long the controller is busy after each instruction
+"""
+
+
+from ifc.Transport import Transport
+
+
+# Execution time of the instructions in seconds, according to the data-sheet
+# (for a controller clocked at 270kHz)
+_LONG_EXECUTION_TIME = 0.00152
+_EXECUTION_TIME = 0.000037
+
+# Size of the display data and character generator RAM in bytes
+_DDRAM_SIZE = 0x80
+_CGRAM_SIZE = 0x40
+
+
+class _Bus(object):
+  """ Keeps the time of the virtual controllers wired to the same pins
+  """
+
+  __slots__ = ('now',)
+
+  def __init__(self):
+    self.now = 0.0
+
+
+class VirtualHD44780(Transport):
+  """ Simulates a HD44780 controller and the display attached to it
+
+  The controller starts in 8-bit mode, exactly as after power on, and expects
+  the initialization sequence of `HD44780.init`. Instructions that arrive while
+  the controller is still busy are ignored, just as the hardware would, and
+  are counted in `violations`.
+
+  Parameters
+  ----------
+  columns : int, optional
+       the number of characters per line on the screen
+  lines : int, optional
+       the number of lines on the screen
+  readable : {True, False}, optional
+       whether the busy flag can be read (as if the rw pin was connected)
+  frequency : int, optional
+       the frequency of the controller's clock in Hz
+  send_time : float, optional
+       time in seconds it takes to send one chunk of bits on the pins
+  bus : {None, VirtualHD44780}, optional
+       another virtual controller wired to the same rs and DB pins, with an
+       enable pin of its own. The two keep the same time, so time spent on
+       one of them (sending or waiting) passes for the other as well
+
+  Attributes
+  ----------
+  instructions : int
+       the number of instructions executed by the controller
+  sends : int
+       the number of chunks of bits (nibbles or bytes) sent to the controller
+  violations : int
+       the number of chunks sent while the controller was busy
+  """
+
+  def __init__(self, columns=16, lines=2, readable=False, frequency=270000,
+               send_time=0.0, bus=None):
+    self.columns = columns
+    self.lines = lines
+    self.readable = readable
+    self._scale = 270000.0 / frequency
+    self._send_time = send_time
+    self._bus = bus._bus if bus else _Bus()
+    self._power_on()
+
+  def setup(self, pins):
+    self.bit_mode = len(pins['db'])
+    self._power_on()
+
+  def send(self, rs, levels):
+    self._bus.now += self._send_time
+    self.sends += 1
+
+    if self._bus.now < self._busy_until:
+      self.violations += 1
+      return
+
+    # Lines of a 4-bit wiring are not connected to DB3 to DB0, which read low
+    bits = 0
+    for level in tuple(levels) + (0, 0, 0, 0)[:8 - len(levels)]:
+      bits = (bits << 1) | level
+
+    if self._eight_bit:
+      self._execute(rs, bits)
+    elif self._nibble is None:
+      self._nibble = bits & 0xf0
+    else:
+      bits, self._nibble = self._nibble | (bits >> 4), None
+      self._execute(rs, bits)
+
+  def wait_while_busy(self, timeout):
+    bus = self._bus
+    bus.now = max(bus.now, min(self._busy_until, bus.now + timeout))
+    return bus.now >= self._busy_until
+
+  def clock(self):
+    return self._bus.now
+
+  def sleep(self, seconds):
+    self._bus.now += seconds
+
+  def screen(self):
+    """ Return the characters shown on the screen, one string per line. Codes
+    of the characters are mapped with `chr`, so custom characters show as
+    '\\x00' to '\\x07'. A display that is turned off shows blank lines, and so
+    do the lines past the first one in 1-line mode
+    """
+    if not self.display_on:
+      return [ ' ' * self.columns for i in range(self.lines) ]
+
+    span = self._row_span()
+    screen = []
+    for line in range(self.lines):
+      if self.two_lines and line < 2:
+        base = 0x40 if line else 0x00
+      elif line < 1:
+        base = 0x00
+      else:
+        screen += [ ' ' * self.columns ]
+        continue
+
+      screen += [ ''.join(chr(self.ddram[base + (self.shift + c) % span])
+                          for c in range(self.columns)) ]
+    return screen
+
+  def glyph(self, code):
+    """ Return the 8 rows of the 5x8 dot pattern of the custom character with
+    `code` (0 to 7), as stored in CGRAM
+    """
+    start = (code & 0x07) * 8
+    return [ row & 0x1f for row in self.cgram[start : start + 8] ]
+
+  def _power_on(self):
+    """ Resets the controller to the state it is in after power on
+    """
+    self.instructions = 0
+    self.sends = 0
+    self.violations = 0
+    self._busy_until = 0.0
+    self._eight_bit = True
+    self._nibble = None
+
+    self.ddram = [0x20] * _DDRAM_SIZE
+    self.cgram = [0x00] * _CGRAM_SIZE
+    self.address = 0
+    self.in_cgram = False
+    self.increment = True
+    self.entry_shift = False
+    self.shift = 0
+    self.two_lines = False
+    self.display_on = False
+    self.cursor = False
+    self.blink = False
+
+  def _execute(self, rs, bits):
+    """ Executes the instruction or data write carried by `bits` and marks the
+    controller busy for as long as it takes
+    """
+    self.instructions += 1
+    duration = _EXECUTION_TIME
+
+    if rs:
+      self._write(bits)
+    elif bits & 0x80:
+      self.in_cgram = False
+      self.address = bits & 0x7f
+    elif bits & 0x40:
+      self.in_cgram = True
+      self.address = bits & 0x3f
+    elif bits & 0x20:
+      self._eight_bit = bool(bits & 0x10)
+      self.two_lines = bool(bits & 0x08)
+    elif bits & 0x10:
+      step = 1 if bits & 0x04 else -1
+      if bits & 0x08:
+        self.shift = (self.shift + self._row_span() - step) % self._row_span()
+      else:
+        self._move_address(step)
+    elif bits & 0x08:
+      self.display_on = bool(bits & 0x04)
+      self.cursor = bool(bits & 0x02)
+      self.blink = bool(bits & 0x01)
+    elif bits & 0x04:
+      self.increment = bool(bits & 0x02)
+      self.entry_shift = bool(bits & 0x01)
+    elif bits & 0x02:
+      self.in_cgram = False
+      self.address = 0
+      self.shift = 0
+      duration = _LONG_EXECUTION_TIME
+    elif bits & 0x01:
+      self.ddram = [0x20] * _DDRAM_SIZE
+      self.in_cgram = False
+      self.address = 0
+      self.shift = 0
+      self.increment = True
+      duration = _LONG_EXECUTION_TIME
+
+    self._busy_until = self._bus.now + duration * self._scale
+
+  def _write(self, data):
+    """ Writes `data` to CGRAM or DDRAM at the current address and moves the
+    address (and the display, if so set by the entry mode) along
+    """
+    step = 1 if self.increment else -1
+
+    if self.in_cgram:
+      self.cgram[self.address] = data
+      self.address = (self.address + step) % _CGRAM_SIZE
+    else:
+      self.ddram[self.address] = data
+      self._move_address(step)
+      if self.entry_shift:
+        self.shift = (self.shift + step) % self._row_span()
+
+  def _move_address(self, step):
+    """ Moves the DDRAM address by `step`, following the addresses of the
+    lines: 0x00 to 0x27 and 0x40 to 0x67 in 2-line mode, 0x00 to 0x4f in
+    1-line mode
+    """
+    if self.two_lines:
+      row, column = self.address & 0x40, self.address & 0x3f
+      column += step
+      if column > 0x27:
+        row, column = row ^ 0x40, 0
+      elif column < 0:
+        row, column = row ^ 0x40, 0x27
+      self.address = row | column
+    else:
+      self.address = (self.address + step) % 0x50
+
+  def _row_span(self):
+    """ Returns the number of DDRAM addresses in each line
+    """
+    return 0x28 if self.two_lines else 0x50
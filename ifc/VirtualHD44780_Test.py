@@ -0,0 +1,95 @@
+# Python script to test the functionality of VirtualHD44780.py
+# Run from the root of the repository with: python -m ifc.VirtualHD44780_Test
+#
+# Author and Maintainer
+# Ioannes Bracciano <john.bracciano@gmail.com>
+
+
+import unittest
+from ifc import HD44780
+from ifc.VirtualHD44780 import VirtualHD44780
+
+
+class SimpleTestCase(unittest.TestCase):
+
+  def test_bit_modes(self):
+    for pins in (HD44780.PIN_DEFS, {'rs': 1, 'e': 2, 'db': range(3, 11)}):
+      lcd = VirtualHD44780()
+      HD44780.init(pins, lcd)
+      HD44780.set_function(bit_mode=lcd.bit_mode, num_lines=2)
+      HD44780.display_on()
+      HD44780.write("Hello")
+      HD44780.set_ddram_address(0x40)
+      HD44780.write("world")
+      # Assert text is decoded the same in both bit modes
+      self.assertEqual(lcd.screen(), ["Hello           ", "world           "],\
+          "Unexpected contents on screen in {}-bit mode: {}".format(lcd.bit_mode, lcd.screen()))
+
+
+  def test_memory(self):
+    lcd = VirtualHD44780()
+    HD44780.init(transport=lcd)
+    HD44780.set_function(num_lines=2)
+    HD44780.display_on()
+    # Assert dot patterns are stored in CGRAM
+    HD44780.set_cgram_address(0x08)
+    HD44780.write([0x1f, 0x11, 0x11, 0x11, 0x11, 0x11, 0x1f, 0x00])
+    self.assertEqual(lcd.glyph(1), [0x1f, 0x11, 0x11, 0x11, 0x11, 0x11, 0x1f, 0x00],\
+        "Unexpected dot pattern in CGRAM: {}".format(lcd.glyph(1)))
+    # Assert writing past the end of the first line continues on the second
+    HD44780.set_ddram_address(0x27)
+    HD44780.write("ab")
+    self.assertEqual(lcd.ddram[0x40], ord('b'),\
+        "Unexpected DDRAM contents: {}".format(lcd.ddram[0x40]))
+    # Assert shifting the display changes what is visible
+    HD44780.set_ddram_address(0x00)
+    HD44780.write("0123456789abcdefg")
+    HD44780.shift_display("left")
+    self.assertEqual(lcd.screen()[0], "123456789abcdefg",\
+        "Unexpected contents on screen after shift: {}".format(lcd.screen()[0]))
+
+
+  def test_timing(self):
+    # Assert the fixed delays and the busy flag both keep up with the controller
+    for readable in (False, True):
+      lcd = VirtualHD44780(readable=readable)
+      HD44780.init(transport=lcd)
+      HD44780.clear()
+      HD44780.write("Hello world")
+      self.assertEqual(lcd.violations, 0,\
+          "Instructions sent while controller was busy: {}".format(lcd.violations))
+    # Assert polling the busy flag is faster than waiting fixed delays
+    self.assertLess(lcd.clock(), 0.015,\
+        "Polling the busy flag took too long: {}".format(lcd.clock()))
+    # Assert anything sent while the controller is still busy with the last
+    # character is ignored
+    lcd.send(0, (0, 0, 0, 0))
+    self.assertEqual(lcd.violations, 1,\
+        "Expected 1 nibble to be ignored, found {}".format(lcd.violations))
+
+
+  def test_selecting(self):
+    # Two controllers share the bus, each on its own enable pin
+    left = VirtualHD44780()
+    right = VirtualHD44780(bus=left)
+    first = HD44780.init(dict(HD44780.PIN_DEFS, e=22), left)
+    second = HD44780.init(dict(HD44780.PIN_DEFS, e=5), right)
+    for controller, text in ((first, "Left"), (second, "Right")):
+      HD44780.select(controller)
+      HD44780.display_on()
+      HD44780.write(text)
+    # Assert each controller was sent only what was sent while it was selected
+    self.assertEqual(left.screen()[0].strip(), "Left",\
+        "Unexpected contents on screen: {}".format(left.screen()))
+    self.assertEqual(right.screen()[0].strip(), "Right",\
+        "Unexpected contents on screen: {}".format(right.screen()))
+    self.assertTrue(HD44780.selected() is second, "Unexpected selected controller")
+    # Assert the controllers keep the same time
+    self.assertEqual(left.clock(), right.clock(),\
+        "Clocks differ: {} and {}".format(left.clock(), right.clock()))
+
+
+
+if __name__ == "__main__":
+  suite = unittest.TestLoader().loadTestsFromTestCase(SimpleTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)